@@ -1,49 +1,31 @@
-import subprocess
 import os
-import sys
-
-BASE_PATH = "E:/project/PLL/ChinaTelecom"
-
-def change_k_landmark(new_value):
-    script_path = os.path.join(BASE_PATH, 'ChangeKLandmark.py')
-    os.system(f'python {script_path} {new_value}')
-
-def change_flows(new_value):
-    script_path = os.path.join(BASE_PATH, 'ChangeFlows.py')
-    os.system(f'python {script_path} {new_value}')
-
-def run_hundred_times(output_file):
-    script_path = os.path.join(BASE_PATH, 'Runhundredtimes.py')
-    with open(output_file, 'w') as f:
-        result = subprocess.run(['python', script_path], stdout=f, stderr=subprocess.PIPE)
-        if result.stderr:
-            print(f"Error while running {script_path}: {result.stderr.decode('utf-8')}")
 
+from results import write_records
+from Runhundredtimes import BASE_PATH, RESULTS_PATH, SCRIPTS, report
+from sweep import expand_grid, run_jobs
 
 
 def main():
-    # 设置K的值从3到10
-    for k in range(3, 11):
-        print(f"Current k value: {k}")
-        # 使用ChangeKLandmark.py将K值设置为k
-        change_k_landmark(k)
-        
-        # 使用ChangeFlows.py将Flows设置为500
-        change_flows(500)
-        
-        # 运行Runhundredtimes.py并将输出写入到CallK=k.txt
-        output_file = os.path.join(BASE_PATH, "CallK=" + str(k) + ".txt")
-        print(f"Output file path: {output_file}")
-        run_hundred_times(output_file)
-        
-        # 使用ChangeFlows.py将Flows设置为1000
-        change_flows(1000)
-        
-        # 运行Runhundredtimes.py并将输出写入到CallK=k_1000.txt
-        output_file = os.path.join(BASE_PATH, "CallK=" + str(k) + "_1000.txt")
+    # K从3到10, 流数500和1000, 每组运行10次; 每个组合都是独立的任务, 全部并行运行
+    total_runs = 10
+    grid = {'K': range(3, 11), 'flows': [500, 1000], 'seed': range(total_runs)}
+    records = list(run_jobs(expand_grid(SCRIPTS, grid)))
+    write_records(RESULTS_PATH, records)
+
+    for k in grid['K']:
+        for flows in grid['flows']:
+            # 500条流写入CallK=k.txt, 1000条流写入CallK=k_1000.txt
+            suffix = '' if flows == 500 else f'_{flows}'
+            output_file = os.path.join(BASE_PATH, "CallK=" + str(k) + suffix + ".txt")
+            print(f"Output file path: {output_file}")
+            with open(output_file, 'w') as f:
+                for script in SCRIPTS:
+                    runs = [
+                        record for record in records
+                        if record['script'] == script
+                        and record['params'].get('K', k) == k and record['params']['flows'] == flows
+                    ]
+                    report(script, runs, lambda message: print(message, file=f))
 
-        print(f"Output file path: {output_file}")
-        run_hundred_times(output_file)
-        
 if __name__ == "__main__":
     main()
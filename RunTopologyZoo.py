@@ -0,0 +1,140 @@
+import argparse
+import glob
+import inspect
+import io
+import os
+from contextlib import redirect_stdout
+
+import networkx as nx
+
+from results import write_records
+from Runhundredtimes import BASE_PATH, SCRIPTS
+from sweep import expand_grid, load_script, run_jobs
+from topology import TopologyCache, read_topology, simple_graph
+
+TOPOLOGY_DIR = "E:/project/Topology"
+RESULTS_PATH = os.path.join(BASE_PATH, "zoo_results.jsonl")
+TABLE_PATH = os.path.join(BASE_PATH, "zoo_summary.csv")
+
+
+def landmark_shortfall(path, strategies=None):
+    """Why the PLL scripts cannot route path, or None if they can.
+
+    Each script needs at least one landmark, and an ECMP2 script one per
+    share of a split, C by default. Greedy selection stops early when no
+    node improves the group, e.g. in a clique or a star, so the check
+    chooses the landmarks each script would. They land in the landmark
+    cache, so the sweep does not choose them again.
+    """
+    G = None
+    for script in SCRIPTS:
+        module = load_script(script)
+        if not hasattr(module, 'choose_landmarks'):
+            continue
+        if G is None:
+            G = module.load_topology(path)
+        split = inspect.signature(module.route_flows).parameters.get('C')
+        needed = split.default if split else 1
+        for strategy in strategies or [inspect.signature(module.choose_landmarks).parameters['strategy'].default]:
+            with redirect_stdout(io.StringIO()):
+                landmarks = module.choose_landmarks(G, strategy=strategy)
+            if len(landmarks) < needed:
+                return f"{script} gets {len(landmarks)} landmarks with strategy {strategy!r}, needs {needed}"
+    return None
+
+
+def scan_topologies(directory, strategies=None, output=print):
+    """{path: (nodes, links)} of the GML files the strategies can run on.
+
+    Files are compiled into the topology cache on the way, so the workers
+    load them without parsing. Parallel links are merged as load_topology
+    merges them, with a message. A file that does not parse, is directed,
+    is not one connected graph of two or more nodes, or yields too few
+    landmarks (see landmark_shortfall) is skipped with a message, so one
+    bad file does not stop a batch.
+    """
+    sizes = {}
+    for path in sorted(glob.glob(os.path.join(directory, '*.gml'))):
+        try:
+            G = read_topology(path, cache=TopologyCache())
+        except (nx.NetworkXError, ValueError) as error:
+            output(f"Skipping {path}: {error}")
+            continue
+        if G.is_directed():
+            output(f"Skipping {path}: directed graph")
+            continue
+        if G.is_multigraph():
+            links = G.number_of_edges()
+            G = simple_graph(G)
+            if G.number_of_edges() < links:
+                output(f"Merged {links - G.number_of_edges()} parallel links in {path}")
+        if len(G) < 2 or not nx.is_connected(G):
+            output(f"Skipping {path}: not connected")
+            continue
+        shortfall = landmark_shortfall(path, strategies)
+        if shortfall:
+            output(f"Skipping {path}: {shortfall}")
+        else:
+            sizes[path] = (G.number_of_nodes(), G.number_of_edges())
+    return sizes
+
+
+def summary_rows(records, sizes):
+    # One row per topology, script and landmark strategy: means over the runs, as in Runhundredtimes.report().
+    groups = {}
+    for record in records:
+        key = (record['params']['topology'], record['script'], record['params'].get('strategy') or '')
+        groups.setdefault(key, []).append(record)
+    rows = []
+    for (path, script, strategy), runs in sorted(groups.items(), key=lambda item: (item[0][0], SCRIPTS.index(item[0][1]), item[0][2])):
+        nodes, links = sizes[path]
+        rows.append({
+            'topology': os.path.splitext(os.path.basename(path))[0],
+            'nodes': nodes,
+            'links': links,
+            'script': script,
+            'strategy': strategy,
+            'runs': len(runs),
+            'avg_max_utilization': sum(record['max_utilization'] for record in runs) / len(runs),
+            'avg_hop_count': sum(record['avg_hop_count'] for record in runs) / len(runs),
+            'avg_routing_seconds': sum(record['timings']['routing'] for record in runs) / len(runs),
+            'avg_landmark_selection_seconds': sum(record['timings']['landmark_selection'] for record in runs) / len(runs),
+            'avg_best_landmark_seconds': sum(record['timings']['best_landmark'] for record in runs) / len(runs),
+            'avg_construct_index_seconds': sum(record['timings']['construct_index'] for record in runs) / len(runs),
+            'landmark_cached_runs': sum(record['landmark_cached'] for record in runs),
+        })
+    return rows
+
+
+def main(directory=TOPOLOGY_DIR, total_runs=10, workers=None, strategies=None, time_selection=False):
+    sizes = scan_topologies(directory, strategies)
+    grid = {'topology': list(sizes), 'seed': range(total_runs)}
+    if strategies:
+        grid['strategy'] = strategies  # 地标选择策略, 见 landmark_selection.STRATEGIES
+    jobs = expand_grid(SCRIPTS, grid)
+    # 最大的拓扑最先运行, 避免进程池在最后只剩一个大任务
+    jobs.sort(key=lambda job: sizes[job['topology']][::-1], reverse=True)
+    print(f"{len(sizes)} topologies, {len(jobs)} runs")
+
+    # 每条记录完成即写入, 中途失败时已完成的运行不会丢失
+    records = []
+    for i, record in enumerate(run_jobs(jobs, workers, time_selection=time_selection)):
+        records.append(record)
+        write_records(RESULTS_PATH, [record])
+        print(f"Progress: {i+1}/{len(jobs)} runs completed")
+
+    # 汇总表每次重新生成
+    if os.path.exists(TABLE_PATH):
+        os.remove(TABLE_PATH)
+    write_records(TABLE_PATH, summary_rows(records, sizes))
+    print(f"Summary written to {TABLE_PATH}")
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description='Run every strategy in SCRIPTS on every GML topology in a directory.')
+    parser.add_argument('directory', nargs='?', default=TOPOLOGY_DIR)
+    parser.add_argument('--runs', type=int, default=10, help='seeds per topology and script')
+    parser.add_argument('--workers', type=int, help='worker processes, default one per CPU')
+    parser.add_argument('--strategy', nargs='+', help='landmark strategies to compare, default that of each script')
+    parser.add_argument('--time-selection', action='store_true', help='choose landmarks without the landmark cache, to time the selection')
+    args = parser.parse_args()
+    main(args.directory, args.runs, args.workers, args.strategy, args.time_selection)
@@ -1,27 +1,31 @@
-import subprocess
 import os
 import sys
 
+from results import write_records
+from sweep import expand_grid, run_jobs
+
 BASE_PATH = "E:/project/PLL/ChinaTelecom"
 LOG_PATH = os.path.join(BASE_PATH, "FinalLog.txt")
+RESULTS_PATH = os.path.join(BASE_PATH, "results.jsonl")  # 或 .csv
+IMAGE_DIR = None  # 设为目录时, 每次运行的链路利用率图在后台写入该目录
+sys.path.insert(0, BASE_PATH)
 
-def run_script(script_name, output_file):
-    full_script_path = os.path.join(BASE_PATH, script_name)
-    os.environ["MPLBACKEND"] = "Agg"
-    with open(output_file, 'w') as f:
-        subprocess.run(['python', full_script_path], stdout=f, stderr=subprocess.DEVNULL)
+SCRIPTS = [
+    #"V30dijkstra_ChinaTelecom_ECMP_hop.py",
+    #"V30dijkstra_ChinaTelecom_hop.py",
+    #"V30dijkstra_ChinaTelecom_kshortest_hop.py",
+    "V30pll_heuristic_ChinaTelecom_hop.py",
+    "V30pll_heuristic_ChinaTelecom_ECMP1_hop.py",
+    "V30pll_heuristic_ChinaTelecom_ECMP2_hop.py",
+    "V30pll_heuristic2_ChinaTelecom_hop.py",
+    "V31pll_heuristic2_ChinaTelecom_ECMP1_hop.py",
+    "V31pll_heuristic2_ChinaTelecom_ECMP2_hop.py",
+    "V30pll_heuristic3_ChinaTelecom_hop.py",
+    "V31pll_heuristic3_ChinaTelecom_ECMP1_hop.py",
+    "V31pll_heuristic3_ChinaTelecom_ECMP2_hop.py",
+    #"V30pll_heuristic_ChinaTelecom_ECMP3_hop.py",
 
-def extract_values_from_file(output_file):
-    max_utilization = None
-    avg_hop_count = None
-    with open(output_file, 'r') as f:
-        lines = f.readlines()[-10:]  # Consider the last 10 lines
-        for line in lines:
-            if "Maximum utilization:" in line:
-                max_utilization = float(line.split(":")[1].strip().rstrip('%')) / 100
-            elif "Average hop count:" in line:
-                avg_hop_count = float(line.split(":")[1].strip())
-    return max_utilization, avg_hop_count
+]
 
 def dual_output(message):
     """Prints to both cmd and the log file."""
@@ -34,54 +38,33 @@ def clear_log_file():
     with open(LOG_PATH, "w") as log_file:
         log_file.write("")
 
-def main():
-    clear_log_file()
+def report(script, records, output=dual_output):
+    """Averages over the runs of one script, from full-precision records."""
+    avg_max_utilization = sum(record['max_utilization'] for record in records) / len(records)
+    avg_avg_hop_count = sum(record['avg_hop_count'] for record in records) / len(records)
 
-    scripts = [
-        #"V30dijkstra_ChinaTelecom_ECMP_hop.py",
-        #"V30dijkstra_ChinaTelecom_hop.py",
-        #"V30dijkstra_ChinaTelecom_kshortest_hop.py",
-        "V30pll_heuristic_ChinaTelecom_hop.py",
-        "V30pll_heuristic_ChinaTelecom_ECMP1_hop.py",
-        "V30pll_heuristic_ChinaTelecom_ECMP2_hop.py",
-        "V30pll_heuristic2_ChinaTelecom_hop.py",
-        "V31pll_heuristic2_ChinaTelecom_ECMP1_hop.py",
-        "V31pll_heuristic2_ChinaTelecom_ECMP2_hop.py",
-        "V30pll_heuristic3_ChinaTelecom_hop.py",
-        "V31pll_heuristic3_ChinaTelecom_ECMP1_hop.py",
-        "V31pll_heuristic3_ChinaTelecom_ECMP2_hop.py",
-        #"V30pll_heuristic_ChinaTelecom_ECMP3_hop.py",
+    output(f"\nScript: {script}")
+    output(f"Average Maximum Utilization: {avg_max_utilization:.2%}")
+    output(f"Average Hop Count: {avg_avg_hop_count:.2f}")
+    output("-------------------------------")
 
-    ]
-    
+def main():
+    clear_log_file()
 
     total_runs = 10
-    temp_output_file = "temp_output.txt"
+    workers = os.cpu_count()  # 并行运行的进程数
 
-    for script in scripts:
-        total_max_utilization = 0
-        total_avg_hop_count = 0
+    # Run i of every script uses seed i, so all scripts route the same flows.
+    records = run_jobs(expand_grid(SCRIPTS, {'seed': range(total_runs)}), workers, IMAGE_DIR)
+    for script in SCRIPTS:
+        script_records = []
         dual_output(f"Running {script}...")
         for i in range(total_runs):
-            run_script(script, temp_output_file)
-            max_utilization, avg_hop_count = extract_values_from_file(temp_output_file)
-            if max_utilization is not None:
-                total_max_utilization += max_utilization
-            if avg_hop_count is not None:
-                total_avg_hop_count += avg_hop_count
+            script_records.append(next(records))
             # Print progress
             dual_output(f"Progress: {i+1}/{total_runs} runs completed")
-
-        avg_max_utilization = total_max_utilization / total_runs
-        avg_avg_hop_count = total_avg_hop_count / total_runs
-
-        dual_output(f"\nScript: {script}")
-        dual_output(f"Average Maximum Utilization: {avg_max_utilization:.2%}")
-        dual_output(f"Average Hop Count: {avg_avg_hop_count:.2f}")
-        dual_output("-------------------------------")
-
-    # Clean up the temporary file
-    os.remove(temp_output_file)
+        write_records(RESULTS_PATH, script_records)
+        report(script, script_records)
 
 if __name__ == "__main__":
     main()
@@ -1,12 +1,17 @@
 import queue
 import copy
 import random
+import time
 import networkx as nx
-import matplotlib.pyplot as plt
+from link_state import LinkState
+from render import BackgroundRenderer, script_options, show_topology
+from results import run_record
+from topology import TopologyCache, read_topology, simple_graph
 
 class Dijkstra:
     def __init__(self, graph):
         self.graph = graph
+        self.links = LinkState(graph.adj, (((u, v), data) for u, v, data in graph.edges(data=True)))
 
     def average_hop_count(self, paths):
         total_hops = sum(len(path) - 1 for path in paths)
@@ -26,34 +31,33 @@ class Dijkstra:
         flow_per_path = flow_size / num_paths
         for path in paths:
             for i in range(len(path) - 1):
-                self.graph[path[i]][path[i+1]]['bandwidth'] -= flow_per_path
+                self.links.consume(path[i], path[i+1], flow_per_path)
 
     def get_max_utilization_link(self):
-        max_utilization = 0
-        max_link = None
-        for u, v, data in self.graph.edges(data=True):
-            utilization = 1 - data['bandwidth'] / data['initial_bandwidth']
-            if utilization > max_utilization:
-                max_utilization = utilization
-                max_link = (u, v)
-        return max_link, max_utilization
-
-def main():
-    # 从文件中读取图
-    G = nx.read_gml("E:/project/Topology/ChinaTelecom.gml", destringizer=None)
+        return self.links.max_link()
+
+    def get_top_utilization_links(self, n):
+        return self.links.top_links(n)
+
+def load_topology(path="E:/project/Topology/ChinaTelecom.gml"):
+    # 从文件中读取图, 解析结果按文件哈希缓存在topology_cache/中; 平行链路合并为一条, 带宽相加
+    G = simple_graph(read_topology(path, cache=TopologyCache()))
       
-    # 将所有边的权重设置为10，并设置带宽为1000
+    # 将所有边的权重设置为10，并设置带宽为1000 (文件中已给出的权重和带宽保留, 如synthetic.py生成的拓扑)
     for u, v, d in G.edges(data=True):
-        d['weight'] = 10
-        d['bandwidth'] = 1000
-        d['initial_bandwidth'] = 1000
+        d.setdefault('weight', 10)
+        d.setdefault('bandwidth', 1000)
+        d['initial_bandwidth'] = d['bandwidth']
+    return G
 
-    # 绘制图
-    plt.figure(figsize=(15, 20))
-    pos = nx.spring_layout(G)
-    nx.draw(G, pos, with_labels=True, node_color='green', edge_color='red')
-    plt.show()
-    
+
+def route_flows(G, k_landmarks=None, flows=1000, bandwidth=(10, 10), seed=None):
+    # Routes random flows over G, consuming its bandwidth, and prints the results.
+    # Flow bandwidths are drawn from the bandwidth range; a seed makes the flows repeatable.
+    # k_landmarks is unused; every strategy script takes the same arguments.
+    started = time.perf_counter()
+    if seed is not None:
+        random.seed(seed)
     dijkstra = Dijkstra(G)
 
     # 生成五十条流量
@@ -61,14 +65,15 @@ def main():
     nodes = list(G.nodes())  # N6到N17为边缘节点
     all_paths = []
 
-    for _ in range(1000):
+    for _ in range(flows):
         src = random.choice(nodes)
         dest = random.choice(nodes)
         while dest == src:  # 确保目的节点和源节点不同
             dest = random.choice(nodes)
-        bw = random.randint(10, 10)  # 10-20M之间的随机带宽
+        bw = random.randint(*bandwidth)  # 10-20M之间的随机带宽
         D.append((src, dest, bw))
         
+    routing_started = time.perf_counter()
     for src, dest, bw in D:
         # Construct the index with the best landmark.
         lengths, paths = dijkstra.query(src, dest)
@@ -89,6 +94,26 @@ def main():
 
     #pll.get_utilization_links()
 
+    timings = {'setup': routing_started - started, 'routing': time.perf_counter() - routing_started}
+    return run_record(dijkstra.links, avg_hop_count, timings, flows=len(D), bandwidth=bandwidth)
+
+
+def main(headless=False, image=None):
+    G = load_topology()
+
+    # 绘制图
+    if not headless:
+        show_topology(G)
+
+    record = route_flows(G)
+
+    # 链路利用率图在单独的进程中绘制
+    if image:
+        renderer = BackgroundRenderer()
+        renderer.submit(record, image, G)
+        renderer.close()
+
 if __name__ == '__main__':
-    main()
+    # --headless: 不导入matplotlib, 不绘图; --image FILE: 运行结束后保存链路利用率图
+    main(**script_options())
 
@@ -1,40 +1,32 @@
-import queue
-import copy
 import random
+import time
 import networkx as nx
-import matplotlib.pyplot as plt
+from landmark_selection import LandmarkCache, select_landmarks
+from link_state import LinkState
+from pll_index import LandmarkTreeCache
+from render import BackgroundRenderer, script_options, show_topology
+from results import run_record
+from topology import TopologyCache, read_topology, simple_graph
 
 class PrunedLandmarkLabeling:
     def __init__(self, graph, graph_dict):
         self.graph = graph
         self.graph_dict = graph_dict
         self.labels = {}
+        self.index_seconds = 0.0  # time spent in construct_index()
+        self.trees = LandmarkTreeCache()
+        self.links = LinkState(graph_dict)
 
     def average_hop_count(self, paths):
         total_hops = sum(len(path) - 1 for path in paths)
         return total_hops / len(paths)
     
     def construct_index(self, landmarks):
+        # Full shortest-path trees for routing via a landmark, cached per landmark.
+        started = time.perf_counter()
         for v in landmarks:
-            self.labels[v] = self.pruned_bfs(v)
-
-    def pruned_bfs(self, start):
-        dist = {v: float('inf') for v in self.graph_dict}
-        prev = {v: None for v in self.graph_dict}
-        dist[start] = 0
-        q = queue.PriorityQueue()
-        q.put((0, start))
-        while not q.empty():
-            _, v = q.get()
-            for w, data in self.graph_dict[v].items():
-                weight = data['weight']
-                alt = dist[v] + weight
-                if alt < dist[w]:
-                    dist[w] = alt
-                    prev[w] = v
-                    q.put((alt, w))
-        return dist, prev
-
+            self.labels[v] = self.trees.get(self.graph_dict, v)
+        self.index_seconds += time.perf_counter() - started
 
     def query(self, u, v, best_landmark):
         shortest_path_length = float('inf')
@@ -58,19 +50,14 @@ class PrunedLandmarkLabeling:
 
     def update_bandwidth(self, path, flow_size):
         for i in range(len(path) - 1):
-            self.graph_dict[path[i]][path[i+1]]['bandwidth'] -= flow_size
+            self.links.consume(path[i], path[i+1], flow_size)
 
 
     def get_max_utilization_link(self):
-        max_utilization = 0
-        max_link = None
-        for u, neighbors in self.graph_dict.items():
-            for v, data in neighbors.items():
-                utilization = 1 - data['bandwidth'] / data['initial_bandwidth']
-                if utilization > max_utilization:
-                    max_utilization = utilization
-                    max_link = (u, v)
-        return max_link, max_utilization
+        return self.links.max_link()
+
+    def get_top_utilization_links(self, n):
+        return self.links.top_links(n)
     
     def get_utilization_links(self):
         for u, neighbors in self.graph_dict.items():
@@ -97,10 +84,6 @@ class PrunedLandmarkLabeling:
             best_landmark = None
             best_path = None
 
-            # 使用一个临时的图来保存当前的状态
-            temp_graph_dict = copy.deepcopy(self.graph_dict)
-            temp_labels = copy.deepcopy(self.labels)
-
             for landmark in available_landmarks:
                 # Construct the index with the current landmark.
                 self.construct_index([landmark])
@@ -121,11 +104,6 @@ class PrunedLandmarkLabeling:
                 self.update_bandwidth([best_path], bw/C)
                 best_landmarks.append(best_landmark)
                 available_landmarks.remove(best_landmark)  # Remove the selected landmark from the available list
-
-                # Update the main graph_dict and labels to the current state after bandwidth update
-                self.graph_dict = copy.deepcopy(temp_graph_dict)
-                self.labels = copy.deepcopy(temp_labels)
-                self.update_bandwidth([best_path], bw/C)
             else:
                 break  # If no best landmark is found, break out of the loop
 
@@ -138,47 +116,40 @@ class PrunedLandmarkLabeling:
         return random.choice(landmarks)
 
 
-def main():
-    # 从文件中读取图
-    G = nx.read_gml("E:/project/Topology/ChinaTelecom.gml", destringizer=None)
+def load_topology(path="E:/project/Topology/ChinaTelecom.gml"):
+    # 从文件中读取图, 解析结果按文件哈希缓存在topology_cache/中; 平行链路合并为一条, 带宽相加
+    G = simple_graph(read_topology(path, cache=TopologyCache()))
     
-    # 将所有边的权重设置为10，并设置带宽为1000
+    # 将所有边的权重设置为10，并设置带宽为1000 (文件中已给出的权重和带宽保留, 如synthetic.py生成的拓扑)
     for u, v, d in G.edges(data=True):
-        d['weight'] = 10
-        d['bandwidth'] = 1000
-        d['initial_bandwidth'] = 1000
+        d.setdefault('weight', 10)
+        d.setdefault('bandwidth', 1000)
+        d['initial_bandwidth'] = d['bandwidth']
+    return G
 
-    # 绘制图
-    plt.figure(figsize=(15, 20))
-    pos = nx.spring_layout(G)
-    nx.draw(G, pos, with_labels=True, node_color='green', edge_color='red')
-    plt.show()
 
+def choose_landmarks(G, K=10, strategy='greedy'):
     # GSP中心性值排序
-    # 初始化最佳组和最高的Group Betweenness Centrality
-    top_gsp_betweenness = []
-    highest_group_betweenness = 0
-
-    # 贪婪地选择K个节点
-    K = 10  
-    for _ in range(K):
-        best_node = None
-        for node in G.nodes():
-            if node in top_gsp_betweenness:
-                continue 
-            group = top_gsp_betweenness + [node]
-            group_betweenness = nx.group_betweenness_centrality(G, group)
-            if group_betweenness > highest_group_betweenness:
-                best_node = node
-                highest_group_betweenness = group_betweenness
-        if best_node is not None:
-            top_gsp_betweenness.append(best_node)
-        else:
-            break
+    # strategy 'greedy': 贪婪地选择K个节点, 路径计数只预处理一次 (结果与逐个调用nx.group_betweenness_centrality相同)
+    # 'celf': 惰性贪婪, 跳过增益上界不可能胜出的候选节点
+    # 'sampled': 抽样估计组介数 (epsilon/delta/seed 见 landmark_selection), 适用于大规模拓扑
+    selection_stats = {}
+    # 相同拓扑的地标顺序缓存在landmark_cache/中, 较小的K直接取前缀
+    top_gsp_betweenness = select_landmarks(G, K, strategy, selection_stats, cache=LandmarkCache())
+    print('Gain evaluations:', selection_stats['evaluations'], 'saved:', selection_stats['saved'], 'cached:', selection_stats['cached'])
 
     # 选择前K个节点作为地标 
     k_landmarks = top_gsp_betweenness[:K]
     print("Top K nodes by centrality:", k_landmarks)
+    return k_landmarks
+
+
+def route_flows(G, k_landmarks, flows=1000, bandwidth=(10, 10), seed=None, C=2):
+    # Routes random flows over G, consuming its bandwidth, and prints the results.
+    # Flow bandwidths are drawn from the bandwidth range; a seed makes the flows repeatable.
+    started = time.perf_counter()
+    if seed is not None:
+        random.seed(seed)
 
     # Convert the graph to a adjacency dictionary.
     graph_dict = nx.to_dict_of_dicts(G)
@@ -190,18 +161,21 @@ def main():
     nodes = list(G.nodes())  # N6到N17为边缘节点
     all_paths = []
 
-    for _ in range(1000):
+    for _ in range(flows):
         src = random.choice(nodes)
         dest = random.choice(nodes)
         while dest == src:  # 确保目的节点和源节点不同
             dest = random.choice(nodes)
-        bw = random.randint(10, 10)  # 10-20M之间的随机带宽
+        bw = random.randint(*bandwidth)  # 10-20M之间的随机带宽
         D.append((src, dest, bw))
 
-    C = 2  # Define the number of landmarks you want to use
+    routing_started = time.perf_counter()
+    selection_seconds = 0.0  # 选择地标的时间, 不含其中construct_index()的时间
     for src, dest, bw in D:
         # Construct the index with the best landmark set.
+        indexed, selecting = pll.index_seconds, time.perf_counter()
         best_landmarks = pll.get_best_landmark_set(k_landmarks, src, dest, bw, C)
+        selection_seconds += time.perf_counter() - selecting - (pll.index_seconds - indexed)
         print('best_landmarks=', best_landmarks, 'bw=', bw/C)
         
         for landmark in best_landmarks:
@@ -225,6 +199,32 @@ def main():
 
     #pll.get_utilization_links()
 
+    timings = {
+        'setup': routing_started - started,
+        'routing': time.perf_counter() - routing_started,
+        'best_landmark': selection_seconds,
+        'construct_index': pll.index_seconds,
+    }
+    return run_record(pll.links, avg_hop_count, timings, flows=len(D), bandwidth=bandwidth, landmarks=k_landmarks, C=C)
+
+
+def main(headless=False, image=None):
+    G = load_topology()
+
+    # 绘制图
+    if not headless:
+        show_topology(G)
+
+    k_landmarks = choose_landmarks(G)
+    record = route_flows(G, k_landmarks)
+
+    # 链路利用率图在单独的进程中绘制
+    if image:
+        renderer = BackgroundRenderer()
+        renderer.submit(record, image, G)
+        renderer.close()
+
 if __name__ == '__main__':
-    main()
+    # --headless: 不导入matplotlib, 不绘图; --image FILE: 运行结束后保存链路利用率图
+    main(**script_options())
 
@@ -1,39 +1,45 @@
-import queue
-import copy
 import random
+import time
 import networkx as nx
-import matplotlib.pyplot as plt
+from graph_core import CSRGraph
+from landmark_selection import LandmarkCache, select_landmarks
+from link_state import LinkState, best_path
+from parallel_eval import CandidatePool
+from pll_index import LandmarkTreeCache
+from render import BackgroundRenderer, script_options, show_topology
+from results import run_record
+from topology import TopologyCache, read_topology, simple_graph
 
 class PrunedLandmarkLabeling:
     def __init__(self, graph, graph_dict):
         self.graph = graph
         self.graph_dict = graph_dict
         self.labels = {}
+        self.index_seconds = 0.0  # time spent in construct_index()
+        self.trees = LandmarkTreeCache()
+        self.links = LinkState(graph_dict)
+        self.pool = None  # CandidatePool once enable_parallel() is called
 
     def average_hop_count(self, paths):
         total_hops = sum(len(path) - 1 for path in paths)
         return total_hops / len(paths)
 
+    def enable_parallel(self, landmarks, workers=None):
+        # Score candidate landmarks in worker processes; graph_dict must come from CSRGraph.share().
+        self.pool = CandidatePool(self.graph_dict, workers)
+        self.pool.load_trees({landmark: self.trees.get(self.graph_dict, landmark) for landmark in landmarks})
+
+    def close_parallel(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool = None
+
     def construct_index(self, landmarks):
+        # Full shortest-path trees for routing via a landmark, cached per landmark.
+        started = time.perf_counter()
         for v in landmarks:
-            self.labels[v] = self.pruned_bfs(v)
-
-    def pruned_bfs(self, start):
-        dist = {v: float('inf') for v in self.graph_dict}
-        prev = {v: None for v in self.graph_dict}
-        dist[start] = 0
-        q = queue.PriorityQueue()
-        q.put((0, start))
-        while not q.empty():
-            _, v = q.get()
-            for w, data in self.graph_dict[v].items():
-                weight = data['weight']
-                alt = dist[v] + weight
-                if alt < dist[w]:
-                    dist[w] = alt
-                    prev[w] = v
-                    q.put((alt, w))
-        return dist, prev
+            self.labels[v] = self.trees.get(self.graph_dict, v)
+        self.index_seconds += time.perf_counter() - started
 
     def query(self, u, v, best_landmark):
         shortest_path_length = float('inf')
@@ -57,19 +63,14 @@ class PrunedLandmarkLabeling:
 
     def update_bandwidth(self, path, flow_size):
         for i in range(len(path) - 1):
-            self.graph_dict[path[i]][path[i+1]]['bandwidth'] -= flow_size
+            self.links.consume(path[i], path[i+1], flow_size)
             #self.graph_dict[path[i+1]][path[i]]['bandwidth'] -= flow_size
 
     def get_max_utilization_link(self):
-        max_utilization = 0
-        max_link = None
-        for u, neighbors in self.graph_dict.items():
-            for v, data in neighbors.items():
-                utilization = 1 - data['bandwidth'] / data['initial_bandwidth']
-                if utilization > max_utilization:
-                    max_utilization = utilization
-                    max_link = (u, v)
-        return max_link, max_utilization
+        return self.links.max_link()
+
+    def get_top_utilization_links(self, n):
+        return self.links.top_links(n)
     
     def get_utilization_links(self):
         for u, neighbors in self.graph_dict.items():
@@ -79,139 +80,139 @@ class PrunedLandmarkLabeling:
                     print(f'Link: {u, v}, Utilization: {utilization}')
 
 
-    def get_path_max_utilization(self, path):
-        max_utilization = 0
-        for i in range(len(path) - 1):
-            u, v = path[i], path[i+1]
-            utilization = 1 - self.graph_dict[u][v]['bandwidth'] / self.graph_dict[u][v]['initial_bandwidth']
-            max_utilization = max(max_utilization, utilization)
-        return max_utilization
-    
-    def get_path_total_utilization(self, path):
-        total_utilization = 0
-        for i in range(len(path) - 1):
-            u, v = path[i], path[i+1]
-            utilization = 1 - self.graph_dict[u][v]['bandwidth'] / self.graph_dict[u][v]['initial_bandwidth']
-            total_utilization += utilization
-        return total_utilization
-
-
     def get_best_landmark(self, landmarks, src, dest, bw):
-        best_landmark = None
-        min_score = float('inf')  # 初始化一个非常大的值
-
-        for landmark in landmarks:
-            # Save the current graph_dict and labels
-            current_graph_dict = copy.deepcopy(self.graph_dict)
-            current_labels = copy.deepcopy(self.labels)
-
-            # Construct the index with the current landmark.
-            self.construct_index([landmark])
-            length, path = self.query(src, dest, landmark)
-            self.update_bandwidth(path, bw)
-
-            # Calculate the score for the current path
-            total_utilization = self.get_path_total_utilization(path)
-            score = total_utilization
-
-            # If the score is lower than the current minimum, update the best landmark
-            if score < min_score:
-                best_landmark = landmark
-                min_score = score
-
-            # Restore the current graph_dict and labels
-            self.graph_dict = current_graph_dict
-            self.labels = current_labels
-
-        return best_landmark
+        if self.pool is not None:
+            # Same choice as below, with the candidates scored in worker processes
+            self.construct_index(list(landmarks))
+            candidates = [(landmark,) for landmark in landmarks]
+            best, _ = self.pool.best(src, dest, candidates, bw, 'path_total', self.links.mlu())
+            return best and best[0]
+
+        # Query every candidate path, then score them all (total path utilization) in one NumPy pass
+        self.construct_index(list(landmarks))
+        paths = [self.query(src, dest, landmark)[1] for landmark in landmarks]
+        index, _ = best_path(self.links, paths, bw, 'path_total')
+        return None if index is None else landmarks[index]
 
     def get_random_landmark(self, landmarks):
         return random.choice(landmarks)
 
 
-def main():
-    # 从文件中读取图
-    G = nx.read_gml("E:/project/Topology/ChinaTelecom.gml", destringizer=None)
+def load_topology(path="E:/project/Topology/ChinaTelecom.gml"):
+    # 从文件中读取图, 解析结果按文件哈希缓存在topology_cache/中; 平行链路合并为一条, 带宽相加
+    G = simple_graph(read_topology(path, cache=TopologyCache()))
     
-    # 将所有边的权重设置为10，并设置带宽为1000
+    # 将所有边的权重设置为10，并设置带宽为1000 (文件中已给出的权重和带宽保留, 如synthetic.py生成的拓扑)
     for u, v, d in G.edges(data=True):
-        d['weight'] = 10
-        d['bandwidth'] = 1000
-        d['initial_bandwidth'] = 1000
+        d.setdefault('weight', 10)
+        d.setdefault('bandwidth', 1000)
+        d['initial_bandwidth'] = d['bandwidth']
+    return G
 
-    # 绘制图
-    plt.figure(figsize=(15, 20))
-    pos = nx.spring_layout(G)
-    nx.draw(G, pos, with_labels=True, node_color='green', edge_color='red')
-    plt.show()
 
+def choose_landmarks(G, K=12, strategy='greedy'):
     # GSP中心性值排序
-    # 初始化最佳组和最高的Group Betweenness Centrality
-    top_gsp_betweenness = []
-    highest_group_betweenness = 0
-
-    # 贪婪地选择K个节点
-    K = 12  
-    for _ in range(K):
-        best_node = None
-        for node in G.nodes():
-            if node in top_gsp_betweenness:
-                continue 
-            group = top_gsp_betweenness + [node]
-            group_betweenness = nx.group_betweenness_centrality(G, group)
-            if group_betweenness > highest_group_betweenness:
-                best_node = node
-                highest_group_betweenness = group_betweenness
-        if best_node is not None:
-            top_gsp_betweenness.append(best_node)
-        else:
-            break
+    # strategy 'greedy': 贪婪地选择K个节点, 路径计数只预处理一次 (结果与逐个调用nx.group_betweenness_centrality相同)
+    # 'celf': 惰性贪婪, 跳过增益上界不可能胜出的候选节点
+    # 'sampled': 抽样估计组介数 (epsilon/delta/seed 见 landmark_selection), 适用于大规模拓扑
+    selection_stats = {}
+    # 相同拓扑的地标顺序缓存在landmark_cache/中, 较小的K直接取前缀
+    top_gsp_betweenness = select_landmarks(G, K, strategy, selection_stats, cache=LandmarkCache())
+    print('Gain evaluations:', selection_stats['evaluations'], 'saved:', selection_stats['saved'], 'cached:', selection_stats['cached'])
 
     # 选择前K个节点作为地标 
     k_landmarks = top_gsp_betweenness[:K]
     print("Top K nodes by centrality:", k_landmarks)
+    return k_landmarks
+
+
+def route_flows(G, k_landmarks, flows=1000, bandwidth=(10, 10), seed=None, workers=0):
+    # Routes random flows over G, consuming its bandwidth, and prints the results.
+    # Flow bandwidths are drawn from the bandwidth range; a seed makes the flows repeatable.
+    started = time.perf_counter()
+    if seed is not None:
+        random.seed(seed)
 
     # Convert the graph to a adjacency dictionary.
-    graph_dict = nx.to_dict_of_dicts(G)
+    # workers > 0: 在多个进程中并行评估候选地标, 图放在共享内存中 (结果与顺序评估相同)
+    graph_dict = CSRGraph.from_networkx(G).share() if workers else nx.to_dict_of_dicts(G)
 
     # 实例化PLL类
     pll = PrunedLandmarkLabeling(G, graph_dict)
+    try:
+        if workers:
+            pll.enable_parallel(k_landmarks, workers)
 
-    D = []
-    nodes = list(G.nodes())  # N6到N17为边缘节点
-    all_paths = []
+        D = []
+        nodes = list(G.nodes())  # N6到N17为边缘节点
+        all_paths = []
 
-    for _ in range(1000):
-        src = random.choice(nodes)
-        dest = random.choice(nodes)
-        while dest == src:  # 确保目的节点和源节点不同
+        for _ in range(flows):
+            src = random.choice(nodes)
             dest = random.choice(nodes)
-        bw = random.randint(10, 10)  # 10-20M之间的随机带宽
-        D.append((src, dest, bw))
-
-    for src, dest, bw in D:
-        # Construct the index with the best landmark.
-        best_landmark = pll.get_best_landmark(k_landmarks, src, dest, bw)
-        #best_landmark = pll.get_random_landmark(k_landmarks)
-        print('best_landmark=', best_landmark, 'bw=', bw)
-        pll.construct_index([best_landmark])
-        length, path = pll.query(src, dest, best_landmark)
-        print(f'Shortest path length from {src} to {dest}:', length)
-        print(f'Shortest path from {src} to {dest}:', path)
-        pll.update_bandwidth(path, bw)
-        all_paths.append(path)  # 将路径添加到all_paths列表中
-
-    # Query the link with the maximum utilization
-    max_link, max_utilization = pll.get_max_utilization_link()
-    print('Link with maximum utilization:', max_link)
-    print('Maximum utilization:', "{:.2%}".format(max_utilization))
-
-    # 计算并打印平均跳数
-    avg_hop_count = pll.average_hop_count(all_paths)
-    print('Average hop count:', avg_hop_count)
-
-    #pll.get_utilization_links()
+            while dest == src:  # 确保目的节点和源节点不同
+                dest = random.choice(nodes)
+            bw = random.randint(*bandwidth)  # 10-20M之间的随机带宽
+            D.append((src, dest, bw))
+
+        routing_started = time.perf_counter()
+        selection_seconds = 0.0  # 选择地标的时间, 不含其中construct_index()的时间
+        for src, dest, bw in D:
+            # Construct the index with the best landmark.
+            indexed, selecting = pll.index_seconds, time.perf_counter()
+            best_landmark = pll.get_best_landmark(k_landmarks, src, dest, bw)
+            selection_seconds += time.perf_counter() - selecting - (pll.index_seconds - indexed)
+            #best_landmark = pll.get_random_landmark(k_landmarks)
+            print('best_landmark=', best_landmark, 'bw=', bw)
+            pll.construct_index([best_landmark])
+            length, path = pll.query(src, dest, best_landmark)
+            print(f'Shortest path length from {src} to {dest}:', length)
+            print(f'Shortest path from {src} to {dest}:', path)
+            pll.update_bandwidth(path, bw)
+            all_paths.append(path)  # 将路径添加到all_paths列表中
+
+        # Query the link with the maximum utilization
+        max_link, max_utilization = pll.get_max_utilization_link()
+        print('Link with maximum utilization:', max_link)
+        print('Maximum utilization:', "{:.2%}".format(max_utilization))
+
+        # 计算并打印平均跳数
+        avg_hop_count = pll.average_hop_count(all_paths)
+        print('Average hop count:', avg_hop_count)
+
+        #pll.get_utilization_links()
+    finally:
+        # 出错时也要关闭进程池, 释放共享内存
+        if workers:
+            pll.close_parallel()
+            graph_dict.release()
+
+    timings = {
+        'setup': routing_started - started,
+        'routing': time.perf_counter() - routing_started,
+        'best_landmark': selection_seconds,
+        'construct_index': pll.index_seconds,
+    }
+    return run_record(pll.links, avg_hop_count, timings, flows=len(D), bandwidth=bandwidth, landmarks=k_landmarks)
+
+
+def main(headless=False, image=None):
+    G = load_topology()
+
+    # 绘制图
+    if not headless:
+        show_topology(G)
+
+    k_landmarks = choose_landmarks(G)
+    record = route_flows(G, k_landmarks)
+
+    # 链路利用率图在单独的进程中绘制
+    if image:
+        renderer = BackgroundRenderer()
+        renderer.submit(record, image, G)
+        renderer.close()
 
 if __name__ == '__main__':
-    main()
+    # --headless: 不导入matplotlib, 不绘图; --image FILE: 运行结束后保存链路利用率图
+    main(**script_options())
 
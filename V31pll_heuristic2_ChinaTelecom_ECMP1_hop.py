@@ -1,88 +1,54 @@
-import queue
-import copy
 import random
+import time
 import networkx as nx
-import matplotlib.pyplot as plt
+from landmark_selection import LandmarkCache, select_landmarks
+from link_state import LinkState
+from pll_index import LandmarkTreeCache, count_ecmp_paths, ecmp_link_loads, ecmp_paths
+from render import BackgroundRenderer, script_options, show_topology
+from results import run_record
+from topology import TopologyCache, read_topology, simple_graph
+
+ECMP_SPLITS = (None, 'path', 'hop')
 
 class PrunedLandmarkLabeling:
-    def __init__(self, graph, graph_dict):
+    def __init__(self, graph, graph_dict, max_paths=None, ecmp_split=None):
         self.graph = graph
         self.graph_dict = graph_dict
+        self.max_paths = max_paths  # cap on ECMP paths per flow, None for all
+        if ecmp_split not in ECMP_SPLITS:
+            raise ValueError(f'Unknown ECMP split {ecmp_split!r}, expected one of {ECMP_SPLITS}')
+        self.ecmp_split = ecmp_split  # 'path' or 'hop' to load links off the DAG, None to list paths
         self.labels = {}
+        self.index_seconds = 0.0  # time spent in construct_index()
+        self.trees = LandmarkTreeCache()
+        self.links = LinkState(graph_dict)
 
     def average_hop_count(self, paths):
         total_hops = sum(len(path) - 1 for path in paths)
         return total_hops / len(paths)
 
     def construct_index(self, landmarks):
+        # Full shortest-path trees for routing via a landmark, cached per landmark.
+        started = time.perf_counter()
         for v in landmarks:
-            self.labels[v] = self.pruned_bfs(v)
-
-    def pruned_bfs(self, start):
-        dist = {v: float('inf') for v in self.graph_dict}
-        prev = {v: None for v in self.graph_dict}
-        dist[start] = 0
-        q = queue.PriorityQueue()
-        q.put((0, start))
-        while not q.empty():
-            _, v = q.get()
-            for w, data in self.graph_dict[v].items():
-                weight = data['weight']
-                alt = dist[v] + weight
-                if alt < dist[w]:
-                    dist[w] = alt
-                    prev[w] = v
-                    q.put((alt, w))
-        return dist, prev
-
-    def get_all_shortest_paths(self, start, end):
-        visited = set()
-        stack = [[start]]
-        shortest_paths = []
-
-        while stack:
-            path = stack.pop()
-            node = path[-1]
-
-            if node == end:
-                shortest_paths.append(path)
-                continue
-
-            for neighbor in self.graph_dict[node]:
-                if neighbor not in visited:
-                    new_path = list(path)
-                    new_path.append(neighbor)
-                    stack.append(new_path)
-
-            visited.add(node)
-
-        return shortest_paths
-
+            self.labels[v] = self.trees.get(self.graph_dict, v)
+        self.index_seconds += time.perf_counter() - started
 
     def query(self, u, v, best_landmark):
         shortest_path_length = float('inf')
         all_shortest_paths = []
 
         if u in self.labels[best_landmark][0] and v in self.labels[best_landmark][0]:
-            # 使用ECMP方法从源节点到地标节点
-            paths_to_landmark = self.get_all_shortest_paths(u, best_landmark)
-            # 使用ECMP方法从地标节点到目标节点
-            paths_from_landmark = self.get_all_shortest_paths(best_landmark, v)
-
-            for path_to in paths_to_landmark:
-                for path_from in paths_from_landmark:
-                    combined_path = path_to[:-1] + path_from
-                    path_length = sum(self.graph_dict[combined_path[i]][combined_path[i+1]]['weight'] for i in range(len(combined_path) - 1))
-                    
-                    # Only append the path if it's the shortest found so far
-                    if not all_shortest_paths or path_length == shortest_path_length:
-                        all_shortest_paths.append(combined_path)
-                    elif path_length < shortest_path_length:
-                        shortest_path_length = path_length
-                        all_shortest_paths = [combined_path]
+            # ECMP paths u -> landmark -> v read off the landmark's predecessor DAG
+            dag = self.trees.get_dag(self.graph_dict, best_landmark)
+            shortest_path_length = dag[0][u] + dag[0][v]
+            all_shortest_paths = ecmp_paths(dag, u, v, self.max_paths)
 
         return shortest_path_length, all_shortest_paths
 
+    def count_shortest_paths(self, u, v, landmark):
+        return count_ecmp_paths(self.trees.get_dag(self.graph_dict, landmark), u, v)
+
     def get_path(self, landmark, v):
         path = []
         while v is not None:
@@ -93,18 +59,22 @@ class PrunedLandmarkLabeling:
     def update_bandwidth(self, paths, flow_size):
         for path in paths:
             for i in range(len(path) - 1):
-                self.graph_dict[path[i]][path[i+1]]['bandwidth'] -= flow_size / len(paths)
+                self.links.consume(path[i], path[i+1], flow_size / len(paths))
+
+    def update_bandwidth_on_dag(self, u, v, landmark, flow_size):
+        # Split the flow over the whole predecessor DAG without listing its paths.
+        dag = self.trees.get_dag(self.graph_dict, landmark)
+        loads = ecmp_link_loads(dag, u, v, flow_size, self.ecmp_split)
+        for (a, b), load in loads.items():
+            self.links.consume(a, b, load)
+        # Expected hop count of the flow
+        return sum(loads.values()) / flow_size
 
     def get_max_utilization_link(self):
-        max_utilization = 0
-        max_link = None
-        for u, neighbors in self.graph_dict.items():
-            for v, data in neighbors.items():
-                utilization = 1 - data['bandwidth'] / data['initial_bandwidth']
-                if utilization > max_utilization:
-                    max_utilization = utilization
-                    max_link = (u, v)
-        return max_link, max_utilization
+        return self.links.max_link()
+
+    def get_top_utilization_links(self, n):
+        return self.links.top_links(n)
     
     def get_utilization_links(self):
         for u, neighbors in self.graph_dict.items():
@@ -127,9 +97,8 @@ class PrunedLandmarkLabeling:
         min_avg_score = float('inf')  # 初始化一个非常大的值
 
         for landmark in landmarks:
-            # Save the current graph_dict and labels
-            current_graph_dict = copy.deepcopy(self.graph_dict)
-            current_labels = copy.deepcopy(self.labels)
+            # Record tentative bandwidth updates so they can be undone
+            self.links.begin()
 
             # Construct the index with the current landmark.
             self.construct_index([landmark])
@@ -152,9 +121,8 @@ class PrunedLandmarkLabeling:
                 best_landmark = landmark
                 min_avg_score = avg_score_for_landmark
 
-            # Restore the current graph_dict and labels
-            self.graph_dict = current_graph_dict
-            self.labels = current_labels
+            # Undo the tentative bandwidth updates
+            self.links.rollback()
 
         return best_landmark
 
@@ -162,71 +130,74 @@ class PrunedLandmarkLabeling:
         return random.choice(landmarks)
 
 
-def main():
-    # 从文件中读取图
-    G = nx.read_gml("E:/project/Topology/ChinaTelecom.gml", destringizer=None)
+def load_topology(path="E:/project/Topology/ChinaTelecom.gml"):
+    # 从文件中读取图, 解析结果按文件哈希缓存在topology_cache/中; 平行链路合并为一条, 带宽相加
+    G = simple_graph(read_topology(path, cache=TopologyCache()))
     
-    # 将所有边的权重设置为10，并设置带宽为1000
+    # 将所有边的权重设置为10，并设置带宽为1000 (文件中已给出的权重和带宽保留, 如synthetic.py生成的拓扑)
     for u, v, d in G.edges(data=True):
-        d['weight'] = 10
-        d['bandwidth'] = 1000
-        d['initial_bandwidth'] = 1000
+        d.setdefault('weight', 10)
+        d.setdefault('bandwidth', 1000)
+        d['initial_bandwidth'] = d['bandwidth']
+    return G
 
-    # 绘制图
-    plt.figure(figsize=(15, 20))
-    pos = nx.spring_layout(G)
-    nx.draw(G, pos, with_labels=True, node_color='green', edge_color='red')
-    plt.show()
 
+def choose_landmarks(G, K=12, strategy='greedy'):
     # GSP中心性值排序
-    # 初始化最佳组和最高的Group Betweenness Centrality
-    top_gsp_betweenness = []
-    highest_group_betweenness = 0
-
-    # 贪婪地选择K个节点
-    K = 12  
-    for _ in range(K):
-        best_node = None
-        for node in G.nodes():
-            if node in top_gsp_betweenness:
-                continue 
-            group = top_gsp_betweenness + [node]
-            group_betweenness = nx.group_betweenness_centrality(G, group)
-            if group_betweenness > highest_group_betweenness:
-                best_node = node
-                highest_group_betweenness = group_betweenness
-        if best_node is not None:
-            top_gsp_betweenness.append(best_node)
-        else:
-            break
+    # strategy 'greedy': 贪婪地选择K个节点, 路径计数只预处理一次 (结果与逐个调用nx.group_betweenness_centrality相同)
+    # 'celf': 惰性贪婪, 跳过增益上界不可能胜出的候选节点
+    # 'sampled': 抽样估计组介数 (epsilon/delta/seed 见 landmark_selection), 适用于大规模拓扑
+    selection_stats = {}
+    # 相同拓扑的地标顺序缓存在landmark_cache/中, 较小的K直接取前缀
+    top_gsp_betweenness = select_landmarks(G, K, strategy, selection_stats, cache=LandmarkCache())
+    print('Gain evaluations:', selection_stats['evaluations'], 'saved:', selection_stats['saved'], 'cached:', selection_stats['cached'])
 
     # 选择前K个节点作为地标 
     k_landmarks = top_gsp_betweenness[:K]
     print("Top K nodes by centrality:", k_landmarks)
-    
+    return k_landmarks
+
+
+def route_flows(G, k_landmarks, flows=1000, bandwidth=(10, 10), seed=None, ecmp_split=None, max_paths=None):
+    # Routes random flows over G, consuming its bandwidth, and prints the results.
+    # Flow bandwidths are drawn from the bandwidth range; a seed makes the flows repeatable.
+    started = time.perf_counter()
+    if seed is not None:
+        random.seed(seed)
+
     # Convert the graph to a adjacency dictionary.
     graph_dict = nx.to_dict_of_dicts(G)
 
     # 实例化PLL类
-    pll = PrunedLandmarkLabeling(G, graph_dict)
+    # ecmp_split 'path' 或 'hop': 直接在DAG上分摊流量, 不枚举路径
+    # max_paths: 不分摊时每条流最多枚举的ECMP路径数, None为全部
+    pll = PrunedLandmarkLabeling(G, graph_dict, max_paths=max_paths, ecmp_split=ecmp_split)
 
     D = []
     nodes = list(G.nodes())  # N6到N17为边缘节点
     all_paths = []
+    flow_hops = []  # 每条流按带宽分摊后的期望跳数
 
-    for _ in range(1000):
+    for _ in range(flows):
         src = random.choice(nodes)
         dest = random.choice(nodes)
         while dest == src:  # 确保目的节点和源节点不同
             dest = random.choice(nodes)
-        bw = random.randint(10, 10)  # 10-20M之间的随机带宽
+        bw = random.randint(*bandwidth)  # 10-20M之间的随机带宽
         D.append((src, dest, bw))
 
+    routing_started = time.perf_counter()
+    selection_seconds = 0.0  # 选择地标的时间, 不含其中construct_index()的时间
     for src, dest, bw in D:
         # Construct the index with the best landmark.
+        indexed, selecting = pll.index_seconds, time.perf_counter()
         best_landmark = pll.get_best_landmark(k_landmarks, src, dest, bw)
+        selection_seconds += time.perf_counter() - selecting - (pll.index_seconds - indexed)
         print('best_landmark=', best_landmark, 'bw=', bw)
         pll.construct_index([best_landmark])
+        if pll.ecmp_split:
+            flow_hops.append(pll.update_bandwidth_on_dag(src, dest, best_landmark, bw))
+            continue
         length, paths = pll.query(src, dest, best_landmark)
         print(f'Shortest path length from {src} to {dest}:', length)
         for path in paths:
@@ -234,6 +205,7 @@ def main():
         # Update bandwidth for all paths at once
         pll.update_bandwidth(paths, bw)
         all_paths.extend(paths)  # 将路径添加到all_paths列表中
+        flow_hops.append(pll.average_hop_count(paths))  # 流量在各路径上均分
 
     # Query the link with the maximum utilization
     max_link, max_utilization = pll.get_max_utilization_link()
@@ -241,11 +213,41 @@ def main():
     print('Maximum utilization:', "{:.2%}".format(max_utilization))
 
     # 计算并打印平均跳数
-    avg_hop_count = pll.average_hop_count(all_paths)
-    print('Average hop count:', avg_hop_count)
+    # ecmp_split模式不枚举路径, 没有路径平均跳数, 只有每条流的期望跳数
+    avg_hop_count = None if pll.ecmp_split else pll.average_hop_count(all_paths)
+    if avg_hop_count is not None:
+        print('Average hop count:', avg_hop_count)
+    expected_hop_count = sum(flow_hops) / len(flow_hops)
+    print('Expected hop count per flow:', expected_hop_count)
 
     #pll.get_utilization_links()
 
+    timings = {
+        'setup': routing_started - started,
+        'routing': time.perf_counter() - routing_started,
+        'best_landmark': selection_seconds,
+        'construct_index': pll.index_seconds,
+    }
+    return run_record(pll.links, avg_hop_count, timings, expected_hop_count, flows=len(D), bandwidth=bandwidth, landmarks=k_landmarks, ecmp_split=ecmp_split, max_paths=max_paths)
+
+
+def main(headless=False, image=None):
+    G = load_topology()
+
+    # 绘制图
+    if not headless:
+        show_topology(G)
+
+    k_landmarks = choose_landmarks(G)
+    record = route_flows(G, k_landmarks)
+
+    # 链路利用率图在单独的进程中绘制
+    if image:
+        renderer = BackgroundRenderer()
+        renderer.submit(record, image, G)
+        renderer.close()
+
 if __name__ == '__main__':
-    main()
+    # --headless: 不导入matplotlib, 不绘图; --image FILE: 运行结束后保存链路利用率图
+    main(**script_options())
 
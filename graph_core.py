@@ -0,0 +1,226 @@
+from multiprocessing import shared_memory
+
+import numpy as np
+from scipy.sparse import csr_matrix
+
+LINK_ATTRIBUTES = ('weight', 'bandwidth', 'initial_bandwidth')
+ARRAYS = ('indptr', 'indices', 'arc_link') + LINK_ATTRIBUTES
+
+
+def share_array(array):
+    # Copy an array into a new shared memory block: (block, array view, spec).
+    block = shared_memory.SharedMemory(create=True, size=max(array.nbytes, 1))
+    shared = np.ndarray(array.shape, dtype=array.dtype, buffer=block.buf)
+    shared[...] = array
+    return block, shared, (block.name, array.shape, array.dtype.str)
+
+
+def attach_array(spec):
+    name, shape, dtype = spec
+    # Only the creating process unlinks the block, see CSRGraph.release().
+    block = shared_memory.SharedMemory(name=name)
+    return block, np.ndarray(shape, dtype=np.dtype(dtype), buffer=block.buf)
+
+
+class CSRGraph:
+    """Compact adjacency with interned integer node IDs.
+
+    Node i keeps its arcs in indices[indptr[i]:indptr[i + 1]] in the same order
+    as the networkx adjacency, and arc_link maps every arc to a link ID. Both
+    arcs of an undirected link share one link ID, so weight, bandwidth and
+    initial_bandwidth are stored once per link in NumPy arrays.
+
+    Indexing by node name (graph[u][v]['bandwidth']) returns views over those
+    arrays, so code written against nx.to_dict_of_dicts runs on it unchanged.
+    """
+
+    def __init__(self, nodes, indptr, indices, arc_link, weight, bandwidth, initial_bandwidth):
+        self.nodes = list(nodes)
+        self.node_ids = {v: i for i, v in enumerate(self.nodes)}
+        self.indptr = indptr
+        self.indices = indices
+        self.arc_link = arc_link
+        self.weight = weight
+        self.bandwidth = bandwidth
+        self.initial_bandwidth = initial_bandwidth
+        self.link_views = {}
+        self.neighbor_views = {}
+        self.link_maps = None  # node ID -> {neighbor ID: link ID}, see link_map()
+        self.blocks = []  # shared memory behind the arrays, see share()
+
+    @classmethod
+    def from_networkx(cls, G):
+        return cls.from_adjacency(G.adj)
+
+    @classmethod
+    def from_adjacency(cls, adj):
+        # Any {u: {v: data}} mapping, e.g. G.adj or nx.to_dict_of_dicts(G).
+        nodes = list(adj)
+        node_ids = {v: i for i, v in enumerate(nodes)}
+        link_ids = {}
+        columns = {key: [] for key in LINK_ATTRIBUTES}
+        indptr = [0]
+        indices = []
+        arc_link = []
+        for u in nodes:
+            for v, data in adj[u].items():
+                if id(data) not in link_ids:
+                    link_ids[id(data)] = len(link_ids)
+                    for key in LINK_ATTRIBUTES:
+                        columns[key].append(data[key])
+                indices.append(node_ids[v])
+                arc_link.append(link_ids[id(data)])
+            indptr.append(len(indices))
+        return cls(
+            nodes,
+            np.array(indptr, dtype=np.int64),
+            np.array(indices, dtype=np.int32),
+            np.array(arc_link, dtype=np.int32),
+            np.array(columns['weight']),
+            np.array(columns['bandwidth'], dtype=np.float64),
+            np.array(columns['initial_bandwidth'], dtype=np.float64),
+        )
+
+    def share(self):
+        """A copy whose arrays live in shared memory, for worker processes.
+
+        Writes through either copy (LinkState updates, for one) are seen by
+        every process attached with CSRGraph.attach(graph.spec()). The
+        creating process frees the blocks with release().
+        """
+        blocks, arrays, specs = [], {}, {}
+        for key in ARRAYS:
+            block, arrays[key], specs[key] = share_array(getattr(self, key))
+            blocks.append(block)
+        graph = CSRGraph(self.nodes, *(arrays[key] for key in ARRAYS))
+        graph.blocks = blocks
+        graph.specs = specs
+        return graph
+
+    def spec(self):
+        return self.nodes, self.specs
+
+    @classmethod
+    def attach(cls, spec):
+        nodes, specs = spec
+        blocks, arrays = [], {}
+        for key in ARRAYS:
+            block, arrays[key] = attach_array(specs[key])
+            blocks.append(block)
+        graph = cls(nodes, *(arrays[key] for key in ARRAYS))
+        graph.blocks = blocks
+        return graph
+
+    def release(self):
+        for block in self.blocks:
+            block.close()
+            block.unlink()
+        self.blocks = []
+
+    def num_links(self):
+        return len(self.weight)
+
+    def to_scipy(self):
+        # Weighted adjacency for scipy.sparse.csgraph, sharing the index arrays.
+        return csr_matrix(
+            (self.weight[self.arc_link].astype(np.float64), self.indices, self.indptr),
+            shape=(len(self.nodes), len(self.nodes)),
+        )
+
+    def arcs(self, u_id):
+        # (neighbor ID, link ID) pairs of a node as plain Python ints.
+        start, end = self.indptr[u_id], self.indptr[u_id + 1]
+        return zip(self.indices[start:end].tolist(), self.arc_link[start:end].tolist())
+
+    def link_map(self, u_id):
+        # {neighbor ID: link ID} of a node, built for every node on first use
+        # so name lookups cost a dict probe instead of a scan of the arc slice.
+        if self.link_maps is None:
+            indptr = self.indptr.tolist()
+            indices = self.indices.tolist()
+            links = self.arc_link.tolist()
+            self.link_maps = [
+                dict(zip(indices[indptr[u]:indptr[u + 1]], links[indptr[u]:indptr[u + 1]]))
+                for u in range(len(self.nodes))
+            ]
+        return self.link_maps[u_id]
+
+    def link_id(self, u, v):
+        try:
+            return self.link_map(self.node_ids[u])[self.node_ids[v]]
+        except KeyError:
+            raise KeyError((u, v)) from None
+
+    def link_view(self, link):
+        # One view per link keeps id(data) stable for LinkState.
+        view = self.link_views.get(link)
+        if view is None:
+            view = self.link_views[link] = LinkView(self, link)
+        return view
+
+    def __getitem__(self, u):
+        view = self.neighbor_views.get(u)
+        if view is None:
+            view = self.neighbor_views[u] = NeighborView(self, self.node_ids[u])
+        return view
+
+    def __iter__(self):
+        return iter(self.nodes)
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def __contains__(self, u):
+        return u in self.node_ids
+
+    def keys(self):
+        return iter(self.nodes)
+
+    def values(self):
+        return (self[u] for u in self.nodes)
+
+    def items(self):
+        return ((u, self[u]) for u in self.nodes)
+
+
+class NeighborView:
+    def __init__(self, graph, u_id):
+        self.graph = graph
+        self.u_id = u_id
+        self.links = graph.link_map(u_id)  # in arc order, like the adjacency
+
+    def __getitem__(self, v):
+        link = self.links.get(self.graph.node_ids.get(v))
+        if link is None:
+            raise KeyError(v)
+        return self.graph.link_view(link)
+
+    def __iter__(self):
+        nodes = self.graph.nodes
+        return (nodes[v_id] for v_id in self.links)
+
+    def __len__(self):
+        return len(self.links)
+
+    def __contains__(self, v):
+        return self.graph.node_ids.get(v) in self.links
+
+    def items(self):
+        nodes = self.graph.nodes
+        return ((nodes[v_id], self.graph.link_view(link)) for v_id, link in self.links.items())
+
+
+class LinkView:
+    def __init__(self, graph, link):
+        self.graph = graph
+        self.link = link
+
+    def __getitem__(self, key):
+        if key not in LINK_ATTRIBUTES:
+            raise KeyError(key)
+        return getattr(self.graph, key).item(self.link)
+
+    def __setitem__(self, key, value):
+        if key not in LINK_ATTRIBUTES:
+            raise KeyError(key)
+        getattr(self.graph, key)[self.link] = value
@@ -0,0 +1,467 @@
+import hashlib
+import heapq
+import json
+import math
+import os
+import random
+import tempfile
+from collections import deque
+
+import networkx as nx
+import numpy as np
+
+
+def path_counts(G):
+    """Per-source BFS data of nx's group betweenness preprocessing, as arrays.
+
+    Returns (nodes, D, sigma, delta): hop distances (inf when unreachable),
+    shortest path counts and endpoint-inclusive dependencies, with rows
+    indexed by source. The searches and the accumulation follow nx step
+    for step, so every entry is bit-for-bit what nx computes per call.
+    """
+    nodes = list(G.nodes())
+    node_ids = {v: i for i, v in enumerate(nodes)}
+    n = len(nodes)
+    D = np.full((n, n), np.inf)
+    sigma = np.zeros((n, n))
+    delta = np.zeros((n, n))
+    for s in nodes:
+        order = []
+        preds = {v: [] for v in nodes}
+        count = dict.fromkeys(nodes, 0.0)
+        dist = {s: 0}
+        count[s] = 1.0
+        queue = deque([s])
+        while queue:
+            v = queue.popleft()
+            order.append(v)
+            for w in G[v]:
+                if w not in dist:
+                    queue.append(w)
+                    dist[w] = dist[v] + 1
+                if dist[w] == dist[v] + 1:
+                    count[w] += count[v]
+                    preds[w].append(v)
+        dependency = dict.fromkeys(order, 0)
+        while order:
+            w = order.pop()
+            coeff = (1 + dependency[w]) / count[w]
+            for v in preds[w]:
+                dependency[v] += count[v] * coeff
+        row = node_ids[s]
+        for v, d in dist.items():
+            D[row, node_ids[v]] = d
+            delta[row, node_ids[v]] = dependency[v] + 1 if v != s else dependency[v]
+        sigma[row] = [count[v] for v in nodes]
+    return nodes, D, sigma, delta
+
+
+def path_betweenness(D, sigma, delta):
+    # PB[a, b]: paths through a then b, summed over sources in node order like nx.
+    reached = np.isfinite(D)
+    PB = np.zeros(D.shape)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        for s in range(len(D)):
+            on = reached[s, :, None] & reached[s, None, :] & reached & (D[s, None, :] == D[s, :, None] + D)
+            term = delta[s, None, :] * sigma[s, :, None] * sigma / sigma[s, None, :]
+            PB += np.where(on, term, 0.0)
+    return PB
+
+
+class GroupBetweenness:
+    """nx.group_betweenness_centrality(G, C) for many groups C of one graph.
+
+    nx redoes all-pairs BFS and the path betweenness matrix on every call,
+    and main() calls it once per candidate per round. Here both are built
+    once; a group then costs nx's O(|C|^3) update over the C x C entries,
+    replayed in nx's own order so the values match it exactly.
+    """
+
+    def __init__(self, G):
+        self.nodes, D, sigma, delta = path_counts(G)
+        self.node_ids = {v: i for i, v in enumerate(self.nodes)}
+        self.D = D.tolist()
+        self.sigma = sigma.tolist()
+        self.PB = path_betweenness(D, sigma, delta).tolist()
+        self.reach_counts = np.isfinite(D).sum(axis=1).tolist()
+        self.reached = np.isfinite(D)
+        if G.is_directed():
+            self.connected = nx.is_strongly_connected(G)
+        else:
+            self.connected = nx.is_connected(G)
+
+    def value(self, group):
+        # Same iteration order over the group as nx, which also uses set(group).
+        group = [self.node_ids[v] for v in set(group)]
+        D, sigma = self.D, self.sigma
+        sigma_m = {x: {y: sigma[x][y] for y in group} for x in group}
+        PB_m = {x: {y: self.PB[x][y] for y in group} for x in group}
+        sigma_m_v = {x: dict(row) for x, row in sigma_m.items()}
+        PB_m_v = {x: dict(row) for x, row in PB_m.items()}
+        total = 0
+        for v in group:
+            total += PB_m[v][v]
+            for x in group:
+                for y in group:
+                    dxvy = 0
+                    dxyv = 0
+                    dvxy = 0
+                    if not (sigma_m[x][y] == 0 or sigma_m[x][v] == 0 or sigma_m[v][y] == 0):
+                        if D[x][v] == D[x][y] + D[y][v]:
+                            dxyv = sigma_m[x][y] * sigma_m[y][v] / sigma_m[x][v]
+                        if D[x][y] == D[x][v] + D[v][y]:
+                            dxvy = sigma_m[x][v] * sigma_m[v][y] / sigma_m[x][y]
+                        if D[v][y] == D[v][x] + D[x][y]:
+                            dvxy = sigma_m[v][x] * sigma[x][y] / sigma[v][y]
+                    sigma_m_v[x][y] = sigma_m[x][y] * (1 - dxvy)
+                    PB_m_v[x][y] = PB_m[x][y] - PB_m[x][y] * dxvy
+                    if y != v:
+                        PB_m_v[x][y] -= PB_m[x][v] * dxyv
+                    if x != v:
+                        PB_m_v[x][y] -= PB_m[v][y] * dvxy
+            sigma_m, sigma_m_v = sigma_m_v, sigma_m
+            PB_m, PB_m_v = PB_m_v, PB_m
+
+        # Drop the paths that start or end in the group (endpoints=False).
+        n, c = len(self.nodes), len(group)
+        if n - c < 2:
+            # No pair outside the group is left to cover.
+            return 0
+        if self.connected:
+            scale = c * (2 * n - c - 1)
+        else:
+            scale = 0
+            for g in group:
+                in_group = int(self.reached[g, group].sum()) - 1
+                scale += in_group + 2 * (self.reach_counts[g] - 1 - in_group)
+        total -= scale
+        return total * (1 / ((n - c) * (n - c - 1)))
+
+
+def greedy_group_betweenness(G, K, stats=None):
+    """The landmark loop of main(), without a full nx call per candidate.
+
+    Each round takes the first node, in G.nodes() order, whose group
+    betweenness with the chosen nodes beats the best value so far, and
+    stops once none does, so it returns exactly the list main() builds.
+    """
+    state = GroupBetweenness(G)
+    top_gsp_betweenness = []
+    highest_group_betweenness = 0
+    evaluations = 0
+    for _ in range(K):
+        best_node = None
+        for node in state.nodes:
+            if node in top_gsp_betweenness:
+                continue
+            group_betweenness = state.value(top_gsp_betweenness + [node])
+            evaluations += 1
+            if group_betweenness > highest_group_betweenness:
+                best_node = node
+                highest_group_betweenness = group_betweenness
+        if best_node is not None:
+            top_gsp_betweenness.append(best_node)
+        else:
+            break
+    if stats is not None:
+        stats.update(evaluations=evaluations, saved=0)
+    return top_gsp_betweenness
+
+
+def celf_group_betweenness(G, K, stats=None):
+    """Lazy greedy (CELF): re-evaluate a candidate only when it tops the queue.
+
+    Gains are unnormalized path mass, as every candidate in a round shares
+    the normalization. Adding a node c to the group only shrinks the mass
+    x newly covers, but drops the ordered pairs (x, c) and (c, x) from the
+    pairs x loses as an endpoint, so a gain grows by at most 2 per round.
+    A gain evaluated in round r thus bounds the current one by
+    gain + 2 * (round - r). Since 2 * round is common to every entry, the
+    queue orders by gain - 2 * r, then by position in G.nodes(). A node on
+    top whose gain is current is the greedy pick without evaluating the
+    rest: among equal gains it is the first node, as in main(), which also
+    gives the stop rule.
+    """
+    state = GroupBetweenness(G)
+    nodes = state.nodes
+    n = len(nodes)
+
+    def covered(value, size):
+        return value * ((n - size) * (n - size - 1))
+
+    top_gsp_betweenness = []
+    highest_group_betweenness = 0
+    # (-(gain - 2 * round), node position, round, group betweenness with the node)
+    queue = []
+    for i, node in enumerate(nodes):
+        value = state.value([node])
+        queue.append((-covered(value, 1), i, 0, value))
+    heapq.heapify(queue)
+    evaluations = exhaustive = n
+    while queue and len(top_gsp_betweenness) < K:
+        _, i, evaluated_in, value = heapq.heappop(queue)
+        size = len(top_gsp_betweenness)
+        if evaluated_in == size:
+            if value <= highest_group_betweenness:
+                break
+            top_gsp_betweenness.append(nodes[i])
+            highest_group_betweenness = value
+            if size + 1 < K:
+                exhaustive += n - size - 1
+            continue
+        value = state.value(top_gsp_betweenness + [nodes[i]])
+        evaluations += 1
+        gain = covered(value, size + 1) - covered(highest_group_betweenness, size)
+        heapq.heappush(queue, (2 * size - gain, i, size, value))
+    if stats is not None:
+        stats.update(evaluations=evaluations, saved=exhaustive - evaluations)
+    return top_gsp_betweenness
+
+
+def sample_error(n, K, delta, valid):
+    # Hoeffding plus a union bound over the at most n**K groups of size <= K:
+    # with probability 1 - delta, every group estimate taken over valid
+    # samples is within this of the exact value.
+    return math.sqrt((math.log(2) + K * math.log(n) + math.log(1 / delta)) / (2 * valid))
+
+
+def sample_count(n, K, epsilon, delta):
+    """Samples to draw so a group estimate rests on enough valid ones.
+
+    Only pairs with neither end in the group count towards its estimate,
+    and they are uniform over the pairs outside it, so sample_error()
+    applies to their number, not to all samples. A group of c nodes keeps
+    a share (n - c)(n - c - 1) / (n(n - 1)) of the pairs; the count is
+    scaled by the smallest share for c <= K, so groups of every size
+    expect the valid samples an error of epsilon needs.
+    """
+    valid = math.ceil((math.log(2) + K * math.log(n) + math.log(1 / delta)) / (2 * epsilon ** 2))
+    c = min(K, n - 2)
+    return math.ceil(valid * n * (n - 1) / ((n - c) * (n - c - 1)))
+
+
+def walk_back(preds, sigma, v, rng):
+    # Back to the search root, taking predecessor p with probability sigma[p] / sigma[v].
+    path = [v]
+    while preds[path[-1]]:
+        v = path[-1]
+        path.append(rng.choices(preds[v], weights=[sigma[p] for p in preds[v]])[0])
+    return path
+
+
+def sample_shortest_path(forward, backward, s, t, rng):
+    """One uniformly random shortest s -> t path, or None if t is unreachable.
+
+    forward and backward map each node to its successors and predecessors.
+    A balanced bidirectional BFS grows whichever side has the cheaper
+    frontier, one level at a time, and stops as soon as the two sides meet,
+    so most searches touch only a small part of a large graph. Every
+    shortest path crosses the last level exactly once, at a node w that
+    carries sigma_s(w) * sigma_t(w) of them.
+    """
+    if s == t:
+        return [s]
+    # [adjacency, dist, sigma, preds, frontier, frontier cost]
+    sides = [
+        [forward, {s: 0}, {s: 1}, {s: []}, [s], len(forward[s])],
+        [backward, {t: 0}, {t: 1}, {t: []}, [t], len(backward[t])],
+    ]
+    while sides[0][4] and sides[1][4]:
+        grow = 0 if sides[0][5] <= sides[1][5] else 1
+        adj, dist, sigma, preds, frontier, _ = sides[grow]
+        level = []
+        cost = 0
+        for v in frontier:
+            for w in adj[v]:
+                if w not in dist:
+                    dist[w] = dist[v] + 1
+                    sigma[w] = 0
+                    preds[w] = []
+                    level.append(w)
+                    cost += len(adj[w])
+                if dist[w] == dist[v] + 1:
+                    sigma[w] += sigma[v]
+                    preds[w].append(v)
+        sides[grow][4:] = level, cost
+        other = sides[1 - grow]
+        meet = [w for w in level if w in other[1]]
+        if not meet:
+            continue
+        length = min(other[1][w] for w in meet)
+        meet = [w for w in meet if other[1][w] == length]
+        w = rng.choices(meet, weights=[sigma[w] * other[2][w] for w in meet])[0]
+        path = walk_back(preds, sigma, w, rng)[::-1] + walk_back(other[3], other[2], w, rng)[1:]
+        return path if grow == 0 else path[::-1]
+    return None
+
+
+def sample_shortest_paths(G, count, rng):
+    # count ordered pairs s != t drawn uniformly, each with one random shortest path.
+    nodes = list(G.nodes())
+    forward = {v: list(G.adj[v]) for v in nodes}
+    backward = {v: list(G.pred[v]) for v in nodes} if G.is_directed() else forward
+    pairs = [tuple(rng.sample(nodes, 2)) for _ in range(count)]
+    return pairs, [sample_shortest_path(forward, backward, s, t, rng) for s, t in pairs]
+
+
+def sampled_group_betweenness(G, K, stats=None, epsilon=0.05, delta=0.1, seed=0):
+    """Greedy landmark picks from sampled shortest paths instead of all pairs.
+
+    The group betweenness of C is estimated as the share of sampled pairs
+    outside C whose sampled path passes through C. sample_count(N, K,
+    epsilon, delta) samples leave each group about the valid samples an
+    error of epsilon needs, with probability 1 - delta over all groups.
+    The number left varies with the draw, so stats['epsilon'] reports the
+    bound actually met, from the fewest valid samples any estimate used.
+    The sample count only grows with log N, and each sample is one
+    bidirectional search, so startup stays bounded on large topologies.
+    Rounds follow main(): take the first node beating the best estimate
+    so far, stop once none does. The same seed gives the same picks.
+    """
+    rng = random.Random(seed)
+    nodes = list(G.nodes())
+    node_ids = {v: i for i, v in enumerate(nodes)}
+    n = len(nodes)
+    count = sample_count(n, K, epsilon, delta)
+    pairs, paths = sample_shortest_paths(G, count, rng)
+
+    # Sample/node incidence, interior nodes and endpoints kept apart.
+    interior = [(k, node_ids[v]) for k, path in enumerate(paths) if path for v in path[1:-1]]
+    interior_sample = np.array([k for k, _ in interior], dtype=np.int64)
+    interior_node = np.array([x for _, x in interior], dtype=np.int64)
+    endpoint_sample = np.repeat(np.arange(count), 2)
+    endpoint_node = np.array([node_ids[v] for pair in pairs for v in pair], dtype=np.int64)
+
+    covered = np.zeros(count, dtype=bool)
+    valid = np.ones(count, dtype=bool)  # neither endpoint in the group
+    in_group = np.zeros(n, dtype=bool)
+    top_gsp_betweenness = []
+    highest_group_betweenness = 0
+    fewest_valid = count
+    for _ in range(K):
+        uncovered = (valid & ~covered).astype(float)
+        gained = np.bincount(interior_node, weights=uncovered[interior_sample], minlength=n)
+        lost = np.bincount(endpoint_node, weights=(valid & covered)[endpoint_sample].astype(float), minlength=n)
+        dropped = np.bincount(endpoint_node, weights=valid[endpoint_sample].astype(float), minlength=n)
+        remaining = valid.sum() - dropped
+        estimates = np.divide((valid & covered).sum() - lost + gained, remaining,
+                              out=np.zeros(n), where=remaining > 0)
+        estimates[in_group] = -np.inf
+        if (remaining[~in_group] > 0).any():
+            fewest_valid = min(fewest_valid, int(remaining[~in_group & (remaining > 0)].min()))
+        best = None
+        for x, estimate in enumerate(estimates.tolist()):
+            if estimate > highest_group_betweenness:
+                best, highest_group_betweenness = x, estimate
+        if best is None:
+            break
+        in_group[best] = True
+        top_gsp_betweenness.append(nodes[best])
+        covered[interior_sample[interior_node == best]] = True
+        valid[endpoint_sample[endpoint_node == best]] = False
+    if stats is not None:
+        rounds = min(K, len(top_gsp_betweenness) + 1)
+        stats.update(evaluations=sum(n - r for r in range(rounds)), saved=0, samples=count,
+                     epsilon=sample_error(n, K, delta, fewest_valid))
+    return top_gsp_betweenness
+
+
+STRATEGIES = {
+    'greedy': greedy_group_betweenness,
+    'celf': celf_group_betweenness,
+    'sampled': sampled_group_betweenness,
+}
+
+
+# Strategies whose first k picks do not depend on K, so a longer cached
+# order serves any shorter request.
+PREFIX_STABLE = {'greedy', 'celf'}
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'landmark_cache')
+
+
+def topology_fingerprint(G):
+    # Node order takes part: it decides ties between equal candidates.
+    h = hashlib.sha256()
+    h.update(repr(G.is_directed()).encode())
+    for v in G.nodes():
+        h.update(repr(v).encode() + b'\0')
+    h.update(b'\1')
+    for u, v, data in G.edges(data=True):
+        h.update(repr((u, v, data.get('weight'))).encode() + b'\0')
+    return h.hexdigest()
+
+
+class LandmarkCache:
+    """Landmark orders on disk, one small JSON file per topology and strategy.
+
+    Landmarks are stored as positions in G.nodes(), which the fingerprint
+    pins down, so any node type round-trips. A file also records whether
+    the order is exhausted, i.e. selection stopped before K because no node
+    improved the group, in which case it answers every larger K as well.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def path(self, G, K, strategy, options):
+        key = [topology_fingerprint(G), strategy]
+        if strategy not in PREFIX_STABLE:
+            key.append(f'K={K}')
+        key.extend(f'{name}={options[name]!r}' for name in sorted(options))
+        name = hashlib.sha256('|'.join(key).encode()).hexdigest()[:32]
+        return os.path.join(self.cache_dir, f'{name}.json')
+
+    def read(self, path):
+        try:
+            with open(path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def get(self, G, K, strategy, options):
+        entry = self.read(self.path(G, K, strategy, options))
+        if entry is None:
+            return None
+        if len(entry['landmarks']) < K and not entry['exhausted']:
+            return None
+        nodes = list(G.nodes())
+        return [nodes[i] for i in entry['landmarks'][:K]]
+
+    def put(self, G, K, strategy, options, landmarks):
+        path = self.path(G, K, strategy, options)
+        # A prefix-stable order for a smaller K is a prefix of the stored
+        # one: keep a longer or exhausted order rather than truncate it.
+        existing = self.read(path)
+        if existing is not None and (existing['exhausted'] or len(existing['landmarks']) > len(landmarks)):
+            return
+        node_ids = {v: i for i, v in enumerate(G.nodes())}
+        entry = {'landmarks': [node_ids[v] for v in landmarks], 'exhausted': len(landmarks) < K}
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Write then rename, so parallel runs never read a partial file.
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        with os.fdopen(fd, 'w') as f:
+            json.dump(entry, f)
+        os.replace(tmp, path)
+
+
+def select_landmarks(G, K, strategy='greedy', stats=None, cache=None, **options):
+    # stats, if given, receives the number of group evaluations, how many
+    # the strategy saved against the exhaustive greedy loop and whether the
+    # cache answered. options go to
+    # the strategy, e.g. epsilon, delta and seed for 'sampled'. With a
+    # LandmarkCache, a previous run on the same topology answers directly.
+    if strategy not in STRATEGIES:
+        raise ValueError(f'Unknown landmark strategy {strategy!r}, expected one of {tuple(STRATEGIES)}')
+    if cache is not None:
+        landmarks = cache.get(G, K, strategy, options)
+        if landmarks is not None:
+            if stats is not None:
+                stats.update(evaluations=0, saved=0, cached=True)
+            return landmarks
+    landmarks = STRATEGIES[strategy](G, K, stats, **options)
+    if stats is not None:
+        stats['cached'] = False
+    if cache is not None:
+        cache.put(G, K, strategy, options, landmarks)
+    return landmarks
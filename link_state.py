@@ -0,0 +1,281 @@
+import heapq
+
+import numpy as np
+
+from graph_core import CSRGraph
+
+SCORES = ('mlu', 'path_max', 'path_total')
+
+
+def utilization(data):
+    return 1 - data['bandwidth'] / data['initial_bandwidth']
+
+
+class UtilizationIndex:
+    """Segment tree over link utilization, indexed by edge ID.
+
+    Each tree node holds the edge ID with the highest utilization below it,
+    the lowest ID on ties, so max_link() agrees with a scan in edge order.
+    """
+
+    def __init__(self, links):
+        self.links = []     # edge ID -> link
+        self.values = []    # edge ID -> utilization
+        self.edge_ids = {}  # id(attribute dict) -> edge ID
+        for link, data in links:
+            # Both directions of an undirected link share one attribute dict.
+            if id(data) in self.edge_ids:
+                continue
+            self.edge_ids[id(data)] = len(self.links)
+            self.links.append(link)
+            self.values.append(utilization(data))
+        self.size = 1
+        while self.size < len(self.links):
+            self.size *= 2
+        self.tree = [None] * (2 * self.size)
+        for edge_id in range(len(self.links)):
+            self.tree[self.size + edge_id] = edge_id
+        for node in range(self.size - 1, 0, -1):
+            self.tree[node] = self.better(self.tree[2 * node], self.tree[2 * node + 1])
+
+    def better(self, left, right):
+        if left is None or (right is not None and self.values[right] > self.values[left]):
+            return right
+        return left
+
+    def update(self, data):
+        edge_id = self.edge_ids[id(data)]
+        self.values[edge_id] = utilization(data)
+        node = (self.size + edge_id) // 2
+        while node:
+            self.tree[node] = self.better(self.tree[2 * node], self.tree[2 * node + 1])
+            node //= 2
+
+    def max_link(self):
+        edge_id = self.tree[1]
+        if edge_id is None or self.values[edge_id] <= 0:
+            return None, 0
+        return self.links[edge_id], self.values[edge_id]
+
+    def top_links(self, n):
+        # Best-first walk down the tree: O(n log E).
+        top = []
+        heap = [] if self.tree[1] is None else [(-self.values[self.tree[1]], self.tree[1], 1)]
+        while heap and len(top) < n:
+            _, edge_id, node = heapq.heappop(heap)
+            if node >= self.size:
+                top.append((self.links[edge_id], self.values[edge_id]))
+                continue
+            for child in (2 * node, 2 * node + 1):
+                if self.tree[child] is not None:
+                    heapq.heappush(heap, (-self.values[self.tree[child]], self.tree[child], child))
+        return top
+
+
+class LinkState:
+    """Bandwidth bookkeeping over graph_dict with an undo log.
+
+    Between begin() and rollback() every bandwidth change is recorded, so a
+    what-if trial costs O(links touched) instead of copying the whole graph.
+    Flows only ever consume bandwidth, so the MLU of a trial is the committed
+    network maximum combined with the links the trial touched. The
+    utilization index only ever reflects committed bandwidth.
+    """
+
+    def __init__(self, graph_dict, links=None):
+        self.graph_dict = graph_dict
+        self.undo_log = None
+        if links is None:
+            links = (((u, v), data) for u, neighbors in graph_dict.items() for v, data in neighbors.items())
+        self.index = UtilizationIndex(links)
+
+    def begin(self):
+        self.undo_log = []
+
+    def consume(self, u, v, amount):
+        data = self.graph_dict[u][v]
+        if self.undo_log is not None:
+            self.undo_log.append((data, data['bandwidth']))
+        data['bandwidth'] -= amount
+        if self.undo_log is None:
+            self.index.update(data)
+
+    def savepoint(self):
+        return len(self.undo_log)
+
+    def rollback_to(self, mark):
+        # Undo back to a savepoint, keeping the transaction open.
+        while len(self.undo_log) > mark:
+            data, bandwidth = self.undo_log.pop()
+            data['bandwidth'] = bandwidth
+
+    def rollback(self):
+        for data, bandwidth in reversed(self.undo_log):
+            data['bandwidth'] = bandwidth
+        self.undo_log = None
+
+    def commit(self):
+        for data, _ in self.undo_log:
+            self.index.update(data)
+        self.undo_log = None
+
+    def mlu(self):
+        # O(links touched by the open transaction), whatever the ECMP split.
+        max_utilization = self.index.max_link()[1]
+        for data, _ in self.undo_log or ():
+            max_utilization = max(max_utilization, utilization(data))
+        return max_utilization
+
+    def max_link(self):
+        return self.index.max_link()
+
+    def top_links(self, n):
+        return self.index.top_links(n)
+
+    def utilizations(self):
+        # Committed utilization of every link, in edge ID order.
+        return list(self.index.values)
+
+
+def best_split(links, paths, flow_size, sizes):
+    """Landmark set with the lowest MLU when a flow is split evenly over it.
+
+    paths maps each landmark, in candidate order, to its path list. Sets are
+    searched size by size in itertools.combinations order, and a set only
+    replaces the best one when its MLU is strictly lower, as in an
+    exhaustive loop. Flows only consume bandwidth, so the MLU after part of
+    a set bounds every set extending it, and the committed MLU bounds every
+    set. A branch is cut as soon as its bound cannot beat the best set so
+    far. The loads are applied in the same order as the exhaustive loop,
+    so the MLU values, and hence the result, are exactly the same.
+    Returns (landmark tuple, MLU).
+    """
+    landmarks = list(paths)
+    best, best_mlu = (), float('inf')
+    floor = links.mlu()
+    links.begin()
+
+    def extend(start, chosen, size):
+        nonlocal best, best_mlu
+        share = flow_size / size
+        for i in range(start, len(landmarks) - (size - len(chosen)) + 1):
+            if best_mlu <= floor:
+                return
+            mark = links.savepoint()
+            for path in paths[landmarks[i]]:
+                for j in range(len(path) - 1):
+                    links.consume(path[j], path[j + 1], share)
+            mlu = links.mlu()
+            if mlu < best_mlu:
+                if len(chosen) + 1 == size:
+                    best, best_mlu = tuple(chosen + [landmarks[i]]), mlu
+                else:
+                    extend(i + 1, chosen + [landmarks[i]], size)
+            links.rollback_to(mark)
+
+    for size in sizes:
+        extend(0, [], size)
+    links.rollback()
+    return best, best_mlu
+
+
+def greedy_split(links, paths, flow_size, sid_budget, threshold=0.0):
+    """Grow a landmark set one landmark at a time instead of searching all sets.
+
+    Each step tries every remaining landmark with the flow split evenly
+    over the set plus that landmark, and keeps the one with the lowest MLU
+    (the first on ties). Growth stops at sid_budget landmarks, or once the
+    best step lowers the MLU by no more than threshold. That is
+    O(sid_budget * len(paths)) trials per flow.
+    Returns (landmark tuple, MLU).
+    """
+    chosen, chosen_mlu = (), float('inf')
+    while len(chosen) < min(sid_budget, len(paths)):
+        step, step_mlu = None, float('inf')
+        for landmark in paths:
+            if landmark in chosen:
+                continue
+            trial = chosen + (landmark,)
+            links.begin()
+            for member in trial:
+                for path in paths[member]:
+                    for j in range(len(path) - 1):
+                        links.consume(path[j], path[j + 1], flow_size / len(trial))
+            mlu = links.mlu()
+            links.rollback()
+            if mlu < step_mlu:
+                step, step_mlu = trial, mlu
+        if chosen and chosen_mlu - step_mlu <= threshold:
+            break
+        chosen, chosen_mlu = step, step_mlu
+    return chosen, chosen_mlu
+
+
+def score_paths(links, paths, flow_size, score='mlu'):
+    """Scores of candidate paths in one NumPy pass, one trial per row.
+
+    Each path carries the whole flow, as a begin/update/rollback trial
+    would. Row k of a candidates x links incidence matrix counts how often
+    path k crosses each link any candidate touches, and the loads are
+    subtracted once per crossing, as consume() does, so the scores are
+    exactly those of the trial loop. 'mlu' is the network MLU after the
+    update (heuristic), 'path_max' the highest utilization on the path
+    times len(path) (heuristic2) and 'path_total' the utilization summed
+    hop by hop (heuristic3).
+    """
+    if score not in SCORES:
+        raise ValueError(f'Unknown score {score!r}, expected one of {SCORES}')
+    graph = links.graph_dict
+    csr = isinstance(graph, CSRGraph)
+    node_ids = graph.node_ids if csr else None
+    columns = {}  # link ID, or id(attribute dict) -> column
+    link_data = []  # per column, the link ID or attribute dict
+    hops = []     # per path, the column of every hop in order
+    for path in paths:
+        hops.append([])
+        for u, v in zip(path, path[1:]):
+            if csr:
+                data = key = graph.link_map(node_ids[u])[node_ids[v]]
+            else:
+                data = graph[u][v]
+                key = id(data)
+            if key not in columns:
+                columns[key] = len(link_data)
+                link_data.append(data)
+            hops[-1].append(columns[key])
+    lengths = np.array([len(path_hops) for path_hops in hops], dtype=np.int64)
+    rows = np.repeat(np.arange(len(paths)), lengths)
+    crossed = np.array([column for path_hops in hops for column in path_hops], dtype=np.int64)
+    incidence = np.zeros((len(paths), len(link_data)), dtype=np.int64)
+    np.add.at(incidence, (rows, crossed), 1)
+
+    if csr:
+        bandwidth = graph.bandwidth[link_data].astype(np.float64)
+        initial_bandwidth = graph.initial_bandwidth[link_data].astype(np.float64)
+    else:
+        bandwidth = np.array([data['bandwidth'] for data in link_data], dtype=np.float64)
+        initial_bandwidth = np.array([data['initial_bandwidth'] for data in link_data], dtype=np.float64)
+    loaded = np.broadcast_to(bandwidth, incidence.shape).copy()
+    for crossing in range(1, incidence.max(initial=0) + 1):
+        loaded = np.where(incidence >= crossing, loaded - flow_size, loaded)
+    utilization = 1 - loaded / initial_bandwidth
+    path_max = np.where(incidence > 0, utilization, -np.inf).max(axis=1, initial=-np.inf)
+
+    if score == 'mlu':
+        return np.maximum(path_max, links.mlu())
+    if score == 'path_max':
+        return np.maximum(path_max, 0) * (lengths + (lengths > 0))
+    # Hop utilizations in path order, zero-padded and summed left to right like the loop.
+    offsets = np.arange(len(crossed)) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+    hop_utilization = np.zeros((len(paths), lengths.max(initial=0) + 1))
+    hop_utilization[rows, offsets] = utilization[rows, crossed]
+    return np.cumsum(hop_utilization, axis=1)[:, -1]
+
+
+def best_path(links, paths, flow_size, score='mlu'):
+    # (index, score) of the lowest-scoring path, the first one on ties.
+    if not paths:
+        return None, float('inf')
+    scores = score_paths(links, paths, flow_size, score)
+    index = int(np.argmin(scores))
+    return index, scores[index].item()
@@ -0,0 +1,228 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+
+from graph_core import CSRGraph, attach_array, share_array
+from link_state import SCORES
+
+# Worker-side state, set once per process by attach().
+graph = None
+arc_links = None  # node ID -> {neighbor ID: link ID}
+trees = None      # (spec, block, K x N predecessor matrix)
+
+
+def attach(graph_spec):
+    global graph, arc_links
+    graph = CSRGraph.attach(graph_spec)
+    arc_links = [graph.link_map(u) for u in range(len(graph.nodes))]
+
+
+def attach_trees(spec):
+    global trees
+    if trees is not None and trees[0] == spec:
+        return trees[2]
+    if trees is not None:
+        trees[1].close()
+    block, matrix = attach_array(spec)
+    trees = (spec, block, matrix)
+    return matrix
+
+
+def tree_path(prev, v):
+    # v, prev[v], ..., landmark, like PrunedLandmarkLabeling.get_path on IDs.
+    path = []
+    while v >= 0:
+        path.append(v)
+        v = int(prev[v])
+    return path
+
+
+def path_links(prev, src, dest):
+    # Path through the landmark of a tree row, as in query(), and its link IDs.
+    path = tree_path(prev, src)[:-1] + tree_path(prev, dest)[::-1]
+    return path, [arc_links[path[i]][path[i + 1]] for i in range(len(path) - 1)]
+
+
+def evaluate(task):
+    """Scores of one chunk of candidates, computed in a worker.
+
+    Each candidate is a tuple of tree rows. Its tentative loads go to a
+    local copy of the links it touches, subtracted in the same order as
+    LinkState.consume, so the scores equal the sequential ones bit for bit.
+    """
+    tree_spec, src, dest, flow_size, score, floor, chunk = task
+    prev = attach_trees(tree_spec)
+    results = []
+    for position, rows in chunk:
+        share = flow_size / len(rows)
+        bandwidth = {}
+        for row in rows:
+            path, links = path_links(prev[row], src, dest)
+            for link in links:
+                bandwidth[link] = bandwidth.get(link, graph.bandwidth[link].item()) - share
+        if score == 'mlu':
+            value = floor
+            for link in bandwidth:
+                value = max(value, 1 - bandwidth[link] / graph.initial_bandwidth[link].item())
+        else:
+            # Path scores are for single-landmark candidates, as in get_best_landmark.
+            utilizations = [1 - bandwidth[link] / graph.initial_bandwidth[link].item() for link in links]
+            value = 0
+            if score == 'path_max':
+                for utilization in utilizations:
+                    value = max(value, utilization)
+                value = value * len(path)
+            else:
+                for utilization in utilizations:
+                    value += utilization
+        results.append((position, value))
+    return results
+
+
+def search(task):
+    """link_state.best_split over blocks of landmark sets, in a worker.
+
+    A block is every set of one size that starts with one landmark, a run
+    of consecutive sets in combinations order, so the first best set of
+    each block, taken in block order, gives the first best set overall.
+    Tentative loads go to a local overlay with an undo log, in the same
+    order as the sequential search.
+    """
+    tree_spec, src, dest, flow_size, floor, rows, chunk = task
+    prev = attach_trees(tree_spec)
+    links = [path_links(prev[row], src, dest)[1] for row in rows]
+    results = []
+    for position, (size, first) in chunk:
+        share = flow_size / size
+        bandwidth, undo_log = {}, []
+        best, best_mlu = (), float('inf')
+
+        def extend(start, stop, chosen):
+            nonlocal best, best_mlu
+            for i in range(start, stop):
+                if best_mlu <= floor:
+                    return
+                mark = len(undo_log)
+                for link in links[i]:
+                    undo_log.append((link, bandwidth.get(link)))
+                    bandwidth[link] = bandwidth.get(link, graph.bandwidth[link].item()) - share
+                mlu = floor
+                for link in bandwidth:
+                    mlu = max(mlu, 1 - bandwidth[link] / graph.initial_bandwidth[link].item())
+                if mlu < best_mlu:
+                    if len(chosen) + 1 == size:
+                        best, best_mlu = chosen + (i,), mlu
+                    else:
+                        extend(i + 1, len(rows) - (size - len(chosen) - 1) + 1, chosen + (i,))
+                while len(undo_log) > mark:
+                    link, bw = undo_log.pop()
+                    if bw is None:
+                        del bandwidth[link]
+                    else:
+                        bandwidth[link] = bw
+
+        extend(first, first + 1, ())
+        results.append((position, (best, best_mlu)))
+    return results
+
+
+class CandidatePool:
+    """Scores landmark candidates in worker processes.
+
+    graph must be a CSRGraph made with share(): bandwidth lives in shared
+    memory, so committed updates are visible to the workers without
+    pickling the link state per task, and load_trees() puts the landmark
+    predecessor trees in shared memory the same way. A task only carries
+    the flow and a chunk of candidates. Chunks are reduced in candidate
+    order and a candidate only wins on a strictly lower score, so the
+    result is the same as the sequential loop, whatever the worker count.
+
+    Scores: 'mlu' is the network MLU after the tentative update, 'path_max'
+    the highest link utilization on the path times len(path), and
+    'path_total' the utilization summed over the path. The path scores are
+    for single-landmark candidates.
+    """
+
+    def __init__(self, graph, workers=None, chunks_per_worker=4):
+        if not graph.blocks:
+            raise ValueError('CandidatePool needs a CSRGraph in shared memory, see CSRGraph.share()')
+        self.graph = graph
+        self.workers = workers or os.cpu_count()
+        self.chunks_per_worker = chunks_per_worker
+        self.rows = {}  # landmark -> row of the tree matrix
+        self.tree_block = None
+        self.tree_spec = None
+        self.executor = ProcessPoolExecutor(self.workers, initializer=attach, initargs=(graph.spec(),))
+
+    def load_trees(self, landmark_trees):
+        # landmark -> (dist, prev) as returned by LandmarkTreeCache.get.
+        node_ids = self.graph.node_ids
+        matrix = np.full((len(landmark_trees), len(self.graph.nodes)), -1, dtype=np.int32)
+        self.rows = {}
+        for row, (landmark, (_, prev)) in enumerate(landmark_trees.items()):
+            self.rows[landmark] = row
+            for v, p in prev.items():
+                if p is not None:
+                    matrix[row, node_ids[v]] = node_ids[p]
+        # Workers switch to the new block on their next task.
+        self.release_trees()
+        self.tree_block, _, self.tree_spec = share_array(matrix)
+
+    def run(self, function, items, *args):
+        # function's results for items, in order; a task carries args and a chunk of items.
+        size = max(1, -(-len(items) // (self.workers * self.chunks_per_worker)))
+        chunks = [list(enumerate(items))[i:i + size] for i in range(0, len(items), size)]
+        values = [None] * len(items)
+        for results in self.executor.map(function, ((self.tree_spec, *args, chunk) for chunk in chunks)):
+            for position, value in results:
+                values[position] = value
+        return values
+
+    def scores(self, src, dest, candidates, flow_size, score='mlu', floor=0):
+        # Scores of the landmark tuples in candidates, in order.
+        if score not in SCORES:
+            raise ValueError(f'Unknown score {score!r}, expected one of {SCORES}')
+        node_ids = self.graph.node_ids
+        rows = [tuple(self.rows[landmark] for landmark in candidate) for candidate in candidates]
+        return self.run(evaluate, rows, node_ids[src], node_ids[dest], flow_size, score, floor)
+
+    def best(self, src, dest, candidates, flow_size, score='mlu', floor=0):
+        # (candidate, score) with the lowest score, the first one on ties.
+        best, best_score = None, float('inf')
+        for candidate, value in zip(candidates, self.scores(src, dest, candidates, flow_size, score, floor)):
+            if value < best_score:
+                best, best_score = candidate, value
+        return best, best_score
+
+    def best_split(self, src, dest, landmarks, flow_size, sizes, floor=0):
+        # Same result as link_state.best_split, with the blocks searched in parallel.
+        node_ids = self.graph.node_ids
+        rows = tuple(self.rows[landmark] for landmark in landmarks)
+        blocks = [(size, first) for size in sizes for first in range(len(landmarks) - size + 1)]
+        best, best_mlu = (), float('inf')
+        for indices, mlu in self.run(search, blocks, node_ids[src], node_ids[dest], flow_size, floor, rows):
+            if mlu < best_mlu:
+                best, best_mlu = tuple(landmarks[i] for i in indices), mlu
+        return best, best_mlu
+
+    def greedy_split(self, src, dest, landmarks, flow_size, sid_budget, threshold=0.0, floor=0):
+        # Same result as link_state.greedy_split, scoring each step in parallel.
+        chosen, chosen_mlu = (), float('inf')
+        while len(chosen) < min(sid_budget, len(landmarks)):
+            trials = [chosen + (landmark,) for landmark in landmarks if landmark not in chosen]
+            step, step_mlu = self.best(src, dest, trials, flow_size, 'mlu', floor)
+            if chosen and chosen_mlu - step_mlu <= threshold:
+                break
+            chosen, chosen_mlu = step, step_mlu
+        return chosen, chosen_mlu
+
+    def release_trees(self):
+        if self.tree_block is not None:
+            self.tree_block.close()
+            self.tree_block.unlink()
+            self.tree_block = None
+
+    def close(self):
+        self.executor.shutdown()
+        self.release_trees()
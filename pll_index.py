@@ -0,0 +1,417 @@
+import heapq
+
+import numpy as np
+from scipy.sparse.csgraph import dijkstra
+
+from graph_core import CSRGraph
+
+
+def uniform_weight(graph_dict):
+    # The weight every link shares, or None when weights differ.
+    if isinstance(graph_dict, CSRGraph):
+        weights = graph_dict.weight
+        if len(weights) and (weights == weights[0]).all() and weights[0] > 0:
+            return weights[0].item()
+        return None
+    weights = {data['weight'] for neighbors in graph_dict.values() for data in neighbors.values()}
+    if len(weights) == 1 and next(iter(weights)) > 0:
+        return weights.pop()
+    return None
+
+
+def shortest_path_tree(graph_dict, start):
+    # Full single-source shortest path tree rooted at a landmark.
+    if isinstance(graph_dict, CSRGraph):
+        return csr_shortest_path_tree(graph_dict, start)
+    dist = {v: float('inf') for v in graph_dict}
+    prev = {v: None for v in graph_dict}
+    dist[start] = 0
+    if uniform_weight(graph_dict) is not None:
+        # Vertices leave a level in (distance, name) order, the order the heap pops them in.
+        level = [start]
+        while level:
+            next_level = []
+            for v in sorted(level):
+                for w, data in graph_dict[v].items():
+                    if dist[w] == float('inf'):
+                        dist[w] = dist[v] + data['weight']
+                        prev[w] = v
+                        next_level.append(w)
+            level = next_level
+        return dist, prev
+    heap = [(0, start)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if d > dist[v]:
+            continue  # stale entry, v was settled at a shorter distance
+        for w, data in graph_dict[v].items():
+            alt = d + data['weight']
+            if alt < dist[w]:
+                dist[w] = alt
+                prev[w] = v
+                heapq.heappush(heap, (alt, w))
+    return dist, prev
+
+
+def csr_shortest_path_tree(graph, start):
+    # Same search over integer IDs and flat arrays, mapped back to node names at the end.
+    # Ties go by node name, as in the dict search, so both build the same trees.
+    nodes = graph.nodes
+    indptr = graph.indptr.tolist()
+    indices = graph.indices.tolist()
+    arc_weight = graph.weight[graph.arc_link].tolist()
+    dist = [float('inf')] * len(graph.nodes)
+    prev = [None] * len(graph.nodes)
+    s = graph.node_ids[start]
+    dist[s] = 0
+    if uniform_weight(graph) is not None:
+        level = [s]
+        while level:
+            next_level = []
+            for v in sorted(level, key=nodes.__getitem__):
+                for arc in range(indptr[v], indptr[v + 1]):
+                    w = indices[arc]
+                    if dist[w] == float('inf'):
+                        dist[w] = dist[v] + arc_weight[arc]
+                        prev[w] = v
+                        next_level.append(w)
+            level = next_level
+    else:
+        heap = [(0, start, s)]
+        while heap:
+            d, _, v = heapq.heappop(heap)
+            if d > dist[v]:
+                continue
+            for arc in range(indptr[v], indptr[v + 1]):
+                w = indices[arc]
+                alt = d + arc_weight[arc]
+                if alt < dist[w]:
+                    dist[w] = alt
+                    prev[w] = v
+                    heapq.heappush(heap, (alt, nodes[w], w))
+    return (
+        {nodes[i]: d for i, d in enumerate(dist)},
+        {nodes[i]: None if p is None else nodes[p] for i, p in enumerate(prev)},
+    )
+
+
+def shortest_path_dag(graph_dict, start):
+    # Like shortest_path_tree, but keeps every equal-cost predecessor.
+    dist = {v: float('inf') for v in graph_dict}
+    preds = {v: [] for v in graph_dict}
+    dist[start] = 0
+    if uniform_weight(graph_dict) is not None:
+        level = [start]
+        while level:
+            next_level = []
+            for v in sorted(level):
+                for w, data in graph_dict[v].items():
+                    if dist[w] == float('inf'):
+                        dist[w] = dist[v] + data['weight']
+                        next_level.append(w)
+                    if dist[w] == dist[v] + data['weight']:
+                        preds[w].append(v)
+            level = next_level
+        return dist, preds
+    settled = set()
+    heap = [(0, start)]
+    while heap:
+        d, v = heapq.heappop(heap)
+        if v in settled:
+            continue
+        settled.add(v)
+        for w, data in graph_dict[v].items():
+            alt = d + data['weight']
+            if alt < dist[w]:
+                dist[w] = alt
+                preds[w] = [v]
+                heapq.heappush(heap, (alt, w))
+            elif alt == dist[w] and w not in settled:
+                preds[w].append(v)
+    return dist, preds
+
+
+def dag_paths(dag, target, limit=None):
+    # Root -> target paths, walking predecessor lists back from the target.
+    dist, preds = dag
+    if dist[target] == float('inf'):
+        return []
+    paths = []
+    stack = [[target]]
+    while stack:
+        suffix = stack.pop()
+        if not preds[suffix[-1]]:
+            paths.append(suffix[::-1])
+            if limit is not None and len(paths) >= limit:
+                break
+            continue
+        for p in reversed(preds[suffix[-1]]):
+            stack.append(suffix + [p])
+    return paths
+
+
+def count_dag_paths(dag, target):
+    dist, preds = dag
+    if dist[target] == float('inf'):
+        return 0
+    sigma = {}
+    stack = [target]
+    while stack:
+        v = stack[-1]
+        pending = [p for p in preds[v] if p not in sigma]
+        if pending:
+            stack.extend(pending)
+            continue
+        stack.pop()
+        sigma[v] = sum(sigma[p] for p in preds[v]) if preds[v] else 1
+    return sigma[target]
+
+
+def ecmp_paths(dag, u, v, limit=None):
+    # u -> landmark -> v: every shortest u -> landmark path joined to every landmark -> v one.
+    paths_to_landmark = [path[::-1] for path in dag_paths(dag, u, limit)]
+    paths_from_landmark = dag_paths(dag, v, limit)
+    paths = []
+    for path_to in paths_to_landmark:
+        for path_from in paths_from_landmark:
+            if limit is not None and len(paths) >= limit:
+                return paths
+            paths.append(path_to[:-1] + path_from)
+    return paths
+
+
+def count_ecmp_paths(dag, u, v):
+    return count_dag_paths(dag, u) * count_dag_paths(dag, v)
+
+
+def dag_ancestors(dag, target):
+    # Vertices on some root -> target shortest path, farthest from the root first.
+    _, preds = dag
+    seen = {target}
+    stack = [target]
+    while stack:
+        for p in preds[stack.pop()]:
+            if p not in seen:
+                seen.add(p)
+                stack.append(p)
+    return sorted(seen, key=lambda x: dag[0][x], reverse=True)
+
+
+def dag_link_shares(dag, target, split, towards_root=False):
+    # Share of a root <-> target flow on each DAG arc (p, w), without listing paths.
+    dist, preds = dag
+    if dist[target] == float('inf'):
+        return {}
+    ancestors = dag_ancestors(dag, target)
+    shares = {}
+    if split == 'path':
+        # Equal split over paths: sigma(root -> p) * paths(w -> target) / sigma(root -> target).
+        sigma = {}
+        for x in reversed(ancestors):
+            sigma[x] = sum(sigma[p] for p in preds[x]) if preds[x] else 1
+        below = dict.fromkeys(ancestors, 0)
+        below[target] = 1
+        for w in ancestors:
+            for p in preds[w]:
+                below[p] += below[w]
+                shares[(p, w)] = sigma[p] * below[w] / sigma[target]
+    elif split == 'hop' and towards_root:
+        # Per-hop hashing from the target: split evenly over predecessors.
+        carried = dict.fromkeys(ancestors, 0)
+        carried[target] = 1
+        for w in ancestors:
+            for p in preds[w]:
+                shares[(p, w)] = carried[w] / len(preds[w])
+                carried[p] += shares[(p, w)]
+    elif split == 'hop':
+        # Per-hop hashing from the root: split evenly over next hops towards the target.
+        next_hops = {x: [] for x in ancestors}
+        for w in ancestors:
+            for p in preds[w]:
+                next_hops[p].append(w)
+        carried = dict.fromkeys(ancestors, 0)
+        carried[ancestors[-1]] = 1
+        for p in reversed(ancestors):
+            for w in next_hops[p]:
+                shares[(p, w)] = carried[p] / len(next_hops[p])
+                carried[w] += shares[(p, w)]
+    else:
+        raise ValueError(f'Unknown ECMP split: {split}')
+    return shares
+
+
+def ecmp_link_loads(dag, u, v, flow_size, split='path'):
+    """Per-link load of a u -> landmark -> v flow, in one pass over the DAG.
+
+    split='path' matches an even split over every path ecmp_paths() lists;
+    split='hop' follows per-hop ECMP hashing at every node on the way.
+    """
+    loads = {}
+    for (p, w), share in dag_link_shares(dag, u, split, towards_root=True).items():
+        loads[(w, p)] = loads.get((w, p), 0) + flow_size * share
+    for link, share in dag_link_shares(dag, v, split).items():
+        loads[link] = loads.get(link, 0) + flow_size * share
+    return loads
+
+
+class LandmarkTreeCache:
+    """Shortest path trees keyed by (landmark, weight version).
+
+    Bandwidth updates never touch link weights, so a tree built once per
+    landmark stays valid until invalidate() is called on a weight change.
+    The predecessor DAGs used for ECMP are cached the same way.
+    """
+
+    def __init__(self):
+        self.weight_version = 0
+        self.trees = {}  # landmark -> (weight_version, (dist, prev))
+        self.dags = {}   # landmark -> (weight_version, (dist, preds))
+
+    def get(self, graph_dict, landmark):
+        return self.lookup(self.trees, shortest_path_tree, graph_dict, landmark)
+
+    def get_dag(self, graph_dict, landmark):
+        return self.lookup(self.dags, shortest_path_dag, graph_dict, landmark)
+
+    def lookup(self, cache, build, graph_dict, landmark):
+        entry = cache.get(landmark)
+        if entry is None or entry[0] != self.weight_version:
+            entry = (self.weight_version, build(graph_dict, landmark))
+            cache[landmark] = entry
+        return entry[1]
+
+    def invalidate(self):
+        self.weight_version += 1
+
+
+class LandmarkDistances:
+    """Distances and predecessors from every landmark as K x N NumPy arrays.
+
+    Row k belongs to landmarks[k], column i to nodes[i]. One csgraph call
+    builds both matrices, after which the u -> L -> v length over all
+    landmarks is a single vector sum. Predecessors of -9999 mean none.
+    """
+
+    def __init__(self, graph_dict, landmarks):
+        graph = graph_dict if isinstance(graph_dict, CSRGraph) else CSRGraph.from_adjacency(graph_dict)
+        self.landmarks = list(landmarks)
+        self.nodes = graph.nodes
+        self.node_ids = graph.node_ids
+        self.dist, self.pred = dijkstra(
+            graph.to_scipy(),
+            directed=True,
+            indices=[self.node_ids[landmark] for landmark in self.landmarks],
+            return_predecessors=True,
+        )
+
+    def via(self, u, v):
+        # Length of u -> L -> v for every landmark L, in landmark order.
+        return self.dist[:, self.node_ids[u]] + self.dist[:, self.node_ids[v]]
+
+    def via_pairs(self, sources, targets):
+        # K x P lengths for P flows at once.
+        src = np.array([self.node_ids[u] for u in sources])
+        dst = np.array([self.node_ids[v] for v in targets])
+        return self.dist[:, src] + self.dist[:, dst]
+
+    def candidates(self, u, v, slack=0):
+        # Landmarks whose detour is within slack of the best one.
+        lengths = self.via(u, v)
+        keep = np.isfinite(lengths) & (lengths <= lengths.min() + slack)
+        return [self.landmarks[k] for k in np.flatnonzero(keep)]
+
+    def get_path(self, landmark, v):
+        # v -> landmark along the predecessor row, like PrunedLandmarkLabeling.get_path.
+        k = self.landmarks.index(landmark)
+        i = self.node_ids[v]
+        if not np.isfinite(self.dist[k, i]):
+            return []
+        path = []
+        while i >= 0:
+            path.append(self.nodes[i])
+            i = self.pred[k, i]
+        return path
+
+
+class PrunedLabelIndex:
+    """2-hop cover labels built by pruned Dijkstra searches.
+
+    Hubs are processed in the order they are added. A search from a hub stops
+    at any vertex whose distance the existing labels already answer, so later
+    hubs only label the part of the graph that earlier hubs do not cover.
+    graph_dict is treated as undirected, as produced by nx.to_dict_of_dicts.
+    """
+
+    def __init__(self, graph_dict):
+        self.graph_dict = graph_dict
+        self.order = []
+        self.labels = {v: {} for v in graph_dict}   # v -> {hub: distance}
+        self.parents = {v: {} for v in graph_dict}  # v -> {hub: next vertex towards hub}
+
+    def add_hubs(self, hubs):
+        for hub in hubs:
+            if hub in self.labels[hub]:
+                continue
+            self.order.append(hub)
+            self.pruned_dijkstra(hub)
+
+    def build(self, order=None):
+        # Landmarks first, the remaining vertices by decreasing degree.
+        self.add_hubs(order or [])
+        rest = sorted(self.graph_dict, key=lambda v: len(self.graph_dict[v]), reverse=True)
+        self.add_hubs(rest)
+
+    def pruned_dijkstra(self, hub):
+        dist = {hub: 0}
+        parent = {hub: None}
+        settled = set()
+        heap = [(0, hub)]
+        while heap:
+            d, v = heapq.heappop(heap)
+            if v in settled:
+                continue
+            settled.add(v)
+            # Prune: an earlier hub already covers (hub, v).
+            if self.query(hub, v) <= d:
+                continue
+            self.labels[v][hub] = d
+            self.parents[v][hub] = parent[v]
+            for w, data in self.graph_dict[v].items():
+                alt = d + data['weight']
+                if w not in settled and alt < dist.get(w, float('inf')):
+                    dist[w] = alt
+                    parent[w] = v
+                    heapq.heappush(heap, (alt, w))
+
+    def best_hub(self, u, v):
+        label_u, label_v = self.labels[u], self.labels[v]
+        if len(label_u) > len(label_v):
+            label_u, label_v = label_v, label_u
+        best, best_hub = float('inf'), None
+        for hub, d in label_u.items():
+            other = label_v.get(hub)
+            if other is not None and d + other < best:
+                best, best_hub = d + other, hub
+        return best, best_hub
+
+    def query(self, u, v):
+        return self.best_hub(u, v)[0]
+
+    def query_path(self, u, v):
+        length, hub = self.best_hub(u, v)
+        if hub is None:
+            return length, []
+        path_to_hub = self.get_path(hub, u)[:-1]
+        path_from_hub = self.get_path(hub, v)[::-1]
+        return length, path_to_hub + path_from_hub
+
+    def get_path(self, hub, v):
+        # Every vertex on the search tree of a hub keeps that hub in its label.
+        path = []
+        while v is not None:
+            path.append(v)
+            v = self.parents[v][hub]
+        return path
+
+    def size(self):
+        return sum(len(label) for label in self.labels.values())
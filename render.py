@@ -0,0 +1,101 @@
+import argparse
+from concurrent.futures import ProcessPoolExecutor
+
+import networkx as nx
+
+# matplotlib is only imported by the functions that draw, so headless runs
+# never load it.
+
+layouts = {}  # per process: topology key -> node positions
+
+
+def show_topology(G):
+    # The interactive drawing every strategy script shows before simulating.
+    import matplotlib.pyplot as plt
+    plt.figure(figsize=(15, 20))
+    pos = nx.spring_layout(G)
+    nx.draw(G, pos, with_labels=True, node_color='green', edge_color='red')
+    plt.show()
+
+
+def draw_utilization(G, utilization, path, key=None):
+    """Write G to an image file with links coloured by utilization.
+
+    utilization lists one value per link in G.edges() order, as in a
+    result record. Draws on an Agg figure of its own, so no window opens
+    and no GUI backend is needed. Layouts are seeded, and cached under key
+    when one is given.
+    """
+    from matplotlib import colormaps
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    if key is None or key not in layouts:
+        pos = nx.spring_layout(G, seed=0)
+        if key is not None:
+            layouts[key] = pos
+    else:
+        pos = layouts[key]
+    figure = Figure(figsize=(15, 20))
+    FigureCanvasAgg(figure)
+    ax = figure.add_subplot()
+    ax.set_axis_off()
+    nx.draw_networkx_nodes(G, pos, ax=ax, node_color='green', node_size=200)
+    nx.draw_networkx_labels(G, pos, ax=ax, font_size=8)
+    edges = nx.draw_networkx_edges(
+        G, pos, ax=ax, edgelist=list(G.edges()), edge_color=utilization,
+        edge_cmap=colormaps['RdYlGn_r'], edge_vmin=0, edge_vmax=1, width=3,
+    )
+    figure.colorbar(edges, ax=ax, label='Link utilization', shrink=0.5)
+    figure.savefig(path)
+
+
+def render_record(record, path, G=None):
+    # Worker side of BackgroundRenderer: reload the topology if it was not sent.
+    key = None
+    if G is None:
+        from sweep import load_script
+        topology = record['params']['topology']
+        G = load_script(record['script']).load_topology(topology)
+        key = topology
+    draw_utilization(G, record['link_utilization'], path, key)
+    return path
+
+
+class BackgroundRenderer:
+    """Renders result records to image files in a separate process.
+
+    submit() returns at once, so drawing overlaps with the runs still in
+    progress; close() waits for the queued images. An image that failed
+    raises its error from the next submit() or from close(). Without G, the
+    topology is reloaded from the record's 'topology' parameter, as set by
+    sweep.
+    """
+
+    def __init__(self):
+        self.executor = ProcessPoolExecutor(1)
+        self.futures = []
+
+    def submit(self, record, path, G=None):
+        for future in [future for future in self.futures if future.done()]:
+            self.futures.remove(future)
+            future.result()
+        future = self.executor.submit(render_record, record, path, G)
+        self.futures.append(future)
+        return future
+
+    def close(self):
+        try:
+            for future in self.futures:
+                future.result()
+        finally:
+            self.executor.shutdown()
+
+
+def script_options(argv=None):
+    # Command line of a strategy script: main(**script_options()).
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true', help='do not import matplotlib or draw the topology')
+    parser.add_argument('--image', help='after the run, write a utilization-coloured topology image to this file')
+    args = parser.parse_args(argv)
+    return {'headless': args.headless, 'image': args.image}
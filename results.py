@@ -0,0 +1,81 @@
+import csv
+import json
+import os
+
+FORMATS = ('.csv', '.jsonl')
+
+
+def run_record(links, avg_hop_count, timings, expected_hop_count=None, **params):
+    """Result of one route_flows() run as a plain dict.
+
+    Values keep full precision. link_utilization lists every link's
+    utilization in edge ID order, the order graph_dict yields the links
+    (that of G.edges()), so runs on one topology line up link by link.
+    avg_hop_count averages the hops of the listed paths, or is None when
+    a run splits flows without listing paths; expected_hop_count is the
+    mean over flows of each flow's bandwidth-weighted hops, for scripts
+    that split flows over several paths. timings holds seconds per phase
+    and params the settings of the run;
+    the runner adds the script name and the random seed.
+    """
+    max_link, max_utilization = links.max_link()
+    return {
+        'max_utilization': max_utilization,
+        'max_link': max_link,
+        'avg_hop_count': avg_hop_count,
+        'expected_hop_count': expected_hop_count,
+        'link_utilization': links.utilizations(),
+        'timings': timings,
+        'params': params,
+    }
+
+
+def flatten(record, prefix=''):
+    # One CSV row: nested dicts become prefix_key columns, lists and tuples JSON text.
+    # params stays one JSON column, since its keys differ from script to script.
+    row = {}
+    for key, value in record.items():
+        if isinstance(value, dict) and key != 'params':
+            row.update(flatten(value, f'{prefix}{key}_'))
+        elif isinstance(value, (dict, list, tuple)):
+            row[prefix + key] = json.dumps(value)
+        else:
+            row[prefix + key] = value
+    return row
+
+
+def write_records(path, records):
+    """Append records to a CSV or JSON Lines file in one write.
+
+    The format follows the extension. A new CSV file takes its columns
+    from the records, in first-seen order; appending to an existing one
+    keeps its header, and a record with a column it lacks raises
+    ValueError instead of being dropped.
+    """
+    extension = os.path.splitext(path)[1].lower()
+    if extension not in FORMATS:
+        raise ValueError(f'Unsupported result file {path!r}, expected one of {FORMATS}')
+    records = list(records)
+    if extension == '.jsonl':
+        with open(path, 'a', encoding='utf-8') as f:
+            f.writelines(json.dumps(record) + '\n' for record in records)
+        return
+    rows = [flatten(record) for record in records]
+    fieldnames = None
+    if os.path.exists(path) and os.path.getsize(path):
+        with open(path, newline='', encoding='utf-8') as f:
+            fieldnames = next(csv.reader(f))
+    with open(path, 'a', newline='', encoding='utf-8') as f:
+        if fieldnames is None:
+            fieldnames = list(dict.fromkeys(key for row in rows for key in row))
+            writer = csv.DictWriter(f, fieldnames)
+            writer.writeheader()
+        else:
+            writer = csv.DictWriter(f, fieldnames)
+        writer.writerows(rows)
+
+
+def read_records(path):
+    # Records written to a JSON Lines file, in order.
+    with open(path, encoding='utf-8') as f:
+        return [json.loads(line) for line in f if line.strip()]
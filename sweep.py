@@ -0,0 +1,178 @@
+import importlib
+import inspect
+import io
+import itertools
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import redirect_stdout
+from functools import partial
+
+from landmark_selection import PREFIX_STABLE, LandmarkCache, select_landmarks
+from render import BackgroundRenderer
+
+# Set in each worker by share_inputs(): every topology and landmark set
+# the jobs need, loaded and chosen once in the parent by run_jobs().
+topologies = {}  # path -> graph
+landmark_sets = {}  # selection key -> (landmarks, selection seconds, cached)
+
+# Grid parameters that go to choose_landmarks rather than route_flows.
+LANDMARK_PARAMETERS = ('K', 'strategy')
+
+
+def expand_grid(scripts, grid):
+    """One job per script and combination of grid values.
+
+    grid maps a parameter name to the values to sweep, e.g.
+    {'K': range(3, 11), 'flows': [500, 1000], 'seed': range(10)}.
+    Jobs come in itertools.product order with the scripts outermost. A
+    script without landmarks gets no K or strategy, and one job per
+    combination of the other values, not one per landmark setting.
+    """
+    names = list(grid)
+    jobs = {}
+    for values in itertools.product(scripts, *(grid[name] for name in names)):
+        job = dict(zip(['script'] + names, values))
+        if not hasattr(load_script(job['script']), 'choose_landmarks'):
+            for name in LANDMARK_PARAMETERS:
+                job.pop(name, None)
+        jobs.setdefault(tuple(job.items()), job)
+    return list(jobs.values())
+
+
+def load_script(script_name):
+    return importlib.import_module(os.path.splitext(script_name)[0])
+
+
+def job_inputs(job):
+    """(script, module, path, K, strategy, route_flows parameters) of a job.
+
+    K and strategy get the choose_landmarks defaults, or are None for a
+    script without landmarks.
+    """
+    params = dict(job)
+    script = params.pop('script')
+    module = load_script(script)
+    path = params.pop('topology', inspect.signature(module.load_topology).parameters['path'].default)
+    K = params.pop('K', None)
+    strategy = params.pop('strategy', None)
+    if hasattr(module, 'choose_landmarks'):
+        defaults = inspect.signature(module.choose_landmarks).parameters
+        if K is None:
+            K = defaults['K'].default
+        if strategy is None:
+            strategy = defaults['strategy'].default
+    else:
+        K = strategy = None
+    return script, module, path, K, strategy, params
+
+
+def selection_key(path, K, strategy):
+    # Every script's choose_landmarks is select_landmarks(G, K, strategy)[:K],
+    # so one selection serves all scripts, and for a prefix-stable strategy
+    # every K: it is made once at the largest K and sliced.
+    return (path, strategy, None if strategy in PREFIX_STABLE else K)
+
+
+def select_job(key, K, cache=True):
+    # The landmarks of one selection key at K, the seconds choosing them took
+    # and whether the landmark cache answered. Without the cache the seconds
+    # time the selection itself.
+    path, strategy, _ = key
+    stats = {}
+    started = time.perf_counter()
+    landmarks = select_landmarks(topologies[path], K, strategy, stats, cache=LandmarkCache() if cache else None)
+    return landmarks, time.perf_counter() - started, stats['cached']
+
+
+def share_inputs(shared_topologies, shared_landmark_sets):
+    # Pool initializer: the parent's topologies and landmark sets, once per worker.
+    topologies.update(shared_topologies)
+    landmark_sets.update(shared_landmark_sets)
+
+
+def run_job(job):
+    """Run one job in this process and return its result record.
+
+    'topology' goes to load_topology, 'K' and 'strategy' to choose_landmarks
+    and every other parameter (flows, bandwidth, seed, C, ...) to route_flows.
+    A parameter a script does not take is ignored, so one grid can cover
+    every script: only ECMP2 has C. run_jobs() rejects a parameter that no
+    script takes.
+    The record gets the script, the seed and the parameters that applied.
+    The topology and landmarks come from share_inputs().
+    """
+    script, module, path, K, strategy, params = job_inputs(job)
+    applied = {'topology': path}
+
+    k_landmarks, selection_time, cached = None, 0.0, False
+    if strategy is not None:
+        landmarks, selection_time, cached = landmark_sets[selection_key(path, K, strategy)]
+        k_landmarks = landmarks[:K]
+        applied['K'] = K
+        applied['strategy'] = strategy
+
+    accepted = inspect.signature(module.route_flows).parameters
+    options = {name: value for name, value in params.items() if name in accepted}
+    # route_flows consumes bandwidth on the graph it gets, so every job routes over a copy.
+    with redirect_stdout(io.StringIO()):
+        record = module.route_flows(topologies[path].copy(), k_landmarks, **options)
+    record['script'] = script
+    record['seed'] = options.get('seed')
+    record['params'] = {**applied, **record['params']}
+    # Scripts without landmarks spend no time on them; the zeros keep the CSV columns alike.
+    record['timings'].setdefault('best_landmark', 0.0)
+    record['timings'].setdefault('construct_index', 0.0)
+    record['timings']['landmark_selection'] = selection_time
+    record['landmark_cached'] = cached
+    return record
+
+
+def run_jobs(jobs, workers=None, image_dir=None, time_selection=False):
+    """Records of jobs run on a process pool, yielded in job order.
+
+    Jobs share nothing but read-only inputs, so any number of them can run
+    at once without touching the scripts. Each topology is loaded once
+    here and each landmark selection (see selection_key) made once, on a
+    first pool; both reach the workers through the pool initializer, so
+    no worker repeats them. Selections go through the LandmarkCache, and
+    records say whether it answered; time_selection bypasses it, so
+    landmark_selection times the selection itself. The jobs never draw;
+    with image_dir, each finished record is handed to a BackgroundRenderer
+    that writes <job number>_<script>.png there while later jobs run.
+    """
+    jobs = list(jobs)
+    inputs = [job_inputs(job) for job in jobs]
+    accepted = set()
+    for _, module, *_ in inputs:
+        accepted.update(inspect.signature(module.route_flows).parameters)
+    unknown = sorted({name for *_, params in inputs for name in params} - accepted)
+    if unknown:
+        raise ValueError(f'No script in the sweep takes {unknown}')
+    shared_topologies = {}
+    largest_K = {}  # selection key -> K to select at
+    for _, module, path, K, strategy, _ in inputs:
+        if path not in shared_topologies:
+            shared_topologies[path] = module.load_topology(path)
+        if strategy is not None:
+            key = selection_key(path, K, strategy)
+            largest_K[key] = max(K, largest_K.get(key, K))
+    keys = list(largest_K)
+    with ProcessPoolExecutor(workers, initializer=share_inputs, initargs=(shared_topologies, {})) as executor:
+        selections = executor.map(partial(select_job, cache=not time_selection), keys, [largest_K[key] for key in keys])
+        shared_landmark_sets = dict(zip(keys, selections))
+
+    renderer = None
+    if image_dir:
+        os.makedirs(image_dir, exist_ok=True)
+        renderer = BackgroundRenderer()
+    try:
+        with ProcessPoolExecutor(workers, initializer=share_inputs, initargs=(shared_topologies, shared_landmark_sets)) as executor:
+            for i, record in enumerate(executor.map(run_job, jobs)):
+                if renderer:
+                    name = f"{i:04d}_{os.path.splitext(record['script'])[0]}.png"
+                    renderer.submit(record, os.path.join(image_dir, name))
+                yield record
+    finally:
+        if renderer:
+            renderer.close()
@@ -0,0 +1,130 @@
+import argparse
+import math
+import os
+import random
+
+import networkx as nx
+import numpy as np
+from scipy.spatial import cKDTree
+
+MODELS = ('waxman', 'ba', 'grid', 'fattree')
+
+
+def waxman(n, rng, beta=0.4, degree=4):
+    """Waxman graph in the unit square with a mean degree of about degree.
+
+    Nodes u, v are linked with probability beta * exp(-d(u, v) / (alpha * L)),
+    L the diagonal. alpha shrinks with n so the mean degree stays put, as in
+    a real WAN. Pairs more than 8 * alpha * L apart, which would carry 0.3%
+    of the links, are never drawn, so the cost grows with the number of
+    links rather than n^2. Every other component is then joined to the
+    largest through its closest pair.
+    """
+    generator = np.random.default_rng(rng.getrandbits(64))
+    pos = generator.random((n, 2))
+    scale = math.sqrt(degree / (2 * math.pi * beta * max(n - 1, 1)))  # alpha * L
+    pairs = cKDTree(pos).query_pairs(8 * scale, output_type='ndarray')
+    pairs = pairs[np.lexsort((pairs[:, 1], pairs[:, 0]))]
+    distance = np.linalg.norm(pos[pairs[:, 0]] - pos[pairs[:, 1]], axis=1)
+    keep = generator.random(len(pairs)) < beta * np.exp(-distance / scale)
+    G = nx.Graph()
+    G.add_nodes_from(range(n))
+    G.add_edges_from(pairs[keep].tolist())
+
+    components = sorted(nx.connected_components(G), key=lambda c: (-len(c), min(c)))
+    main = sorted(components[0])
+    tree = cKDTree(pos[main])
+    for component in components[1:]:
+        component = sorted(component)
+        distance, nearest = tree.query(pos[component])
+        i = int(np.argmin(distance))
+        G.add_edge(component[i], main[nearest[i]])
+    return G
+
+
+def ba(n, rng, m=2):
+    # Barabasi-Albert preferential attachment: power-law degrees, each new node brings m links.
+    return nx.barabasi_albert_graph(n, m, seed=rng)
+
+
+def grid(n, rng):
+    # The first n nodes, row by row, of the smallest near-square grid holding n.
+    cols = math.ceil(math.sqrt(n))
+    G = nx.grid_2d_graph(math.ceil(n / cols), cols)
+    G.remove_nodes_from([(i // cols, i % cols) for i in range(n, len(G))])
+    return G
+
+
+def fattree(n, rng):
+    """Switches of the smallest k-ary fat-tree with at least n of them.
+
+    k is even; there are (k/2)^2 core switches and k pods of k/2
+    aggregation and k/2 edge switches, 5k^2/4 in all. Hosts are left out:
+    flows run between switches like between any other nodes.
+    """
+    k = 2
+    while 5 * k * k // 4 < n:
+        k += 2
+    half = k // 2
+    G = nx.Graph()
+    core = [('core', i) for i in range(half * half)]
+    G.add_nodes_from(core)
+    for pod in range(k):
+        aggregation = [('agg', pod, i) for i in range(half)]
+        edge = [('edge', pod, i) for i in range(half)]
+        G.add_nodes_from(aggregation + edge)
+        for i, a in enumerate(aggregation):
+            G.add_edges_from((a, c) for c in core[i * half:(i + 1) * half])
+            G.add_edges_from((a, e) for e in edge)
+    return G
+
+
+GENERATORS = {'waxman': waxman, 'ba': ba, 'grid': grid, 'fattree': fattree}
+
+
+def generate(model, n, seed=None, weight=(10, 10), bandwidth=(1000, 1000), **options):
+    """A connected synthetic topology, the same for the same arguments.
+
+    Nodes are labelled N0, N1, ... like the GML topologies. Every link
+    gets a weight and a bandwidth drawn from the given ranges, which
+    load_topology keeps; the defaults are the values it sets for
+    topologies without them. options go to the model: beta and degree for
+    'waxman', m for 'ba'. 'fattree' rounds n up to a whole fat-tree.
+    """
+    if model not in GENERATORS:
+        raise ValueError(f'Unknown model {model!r}, expected one of {MODELS}')
+    rng = random.Random(seed)
+    G = GENERATORS[model](n, rng, **options)
+    G = nx.relabel_nodes(G, {v: f'N{i}' for i, v in enumerate(G)})
+    G.graph['name'] = f'{model}{len(G)}'
+    for _, data in G.nodes(data=True):
+        data.clear()
+    for u, v, data in G.edges(data=True):
+        data.clear()
+        data['weight'] = rng.randint(*weight)
+        data['bandwidth'] = rng.randint(*bandwidth)
+    return G
+
+
+def write_topologies(directory, model, sizes, seed=None, **options):
+    # One <model><n>.gml per size, e.g. waxman50.gml, for RunTopologyZoo.py or load_topology().
+    os.makedirs(directory, exist_ok=True)
+    paths = []
+    for n in sizes:
+        G = generate(model, n, seed, **options)
+        paths.append(os.path.join(directory, f"{G.graph['name']}.gml"))
+        nx.write_gml(G, paths[-1])
+    return paths
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Write synthetic topologies as GML files.')
+    parser.add_argument('model', choices=MODELS)
+    parser.add_argument('sizes', type=int, nargs='+', help='node counts, e.g. 50 500 5000 50000')
+    parser.add_argument('--out', default='E:/project/Topology/synthetic')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--weight', type=int, nargs=2, default=(10, 10), metavar=('MIN', 'MAX'))
+    parser.add_argument('--bandwidth', type=int, nargs=2, default=(1000, 1000), metavar=('MIN', 'MAX'))
+    args = parser.parse_args()
+    for path in write_topologies(args.out, args.model, args.sizes, args.seed, weight=args.weight, bandwidth=args.bandwidth):
+        print(path)
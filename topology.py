@@ -0,0 +1,233 @@
+import hashlib
+import heapq
+import json
+import os
+import shutil
+import tempfile
+
+import networkx as nx
+import numpy as np
+
+DEFAULT_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'topology_cache')
+
+# (directed, multigraph) -> the class nx.read_gml returns
+GRAPH_TYPES = {
+    (False, False): nx.Graph,
+    (True, False): nx.DiGraph,
+    (False, True): nx.MultiGraph,
+    (True, True): nx.MultiDiGraph,
+}
+
+# Link attributes that add up when parallel links are merged; Topology Zoo files give LinkSpeedRaw in bit/s.
+CAPACITY_ATTRIBUTES = ('bandwidth', 'capacity', 'LinkSpeedRaw')
+
+
+def file_hash(path):
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def insertion_order(G):
+    """G's edges in an order that rebuilds its adjacency exactly.
+
+    Adding an edge appends to the neighbor lists of both ends (and to the
+    key list of a multigraph pair), so the order of every list is a
+    constraint on the order of the edges. Any order meeting all of them,
+    such as the one the GML file had, gives back the same G.adj, and with
+    it the same G.edges() and neighbor order the routing ties depend on.
+    Returns (u, v, key, data) tuples, key None unless G is a multigraph.
+    """
+    if G.is_multigraph():
+        edges = list(G.edges(keys=True, data=True))
+    else:
+        edges = [(u, v, None, data) for u, v, data in G.edges(data=True)]
+    position = {id(edge[3]): i for i, edge in enumerate(edges)}
+    after = [[] for _ in edges]
+    waiting = [0] * len(edges)
+
+    def chain(items):
+        items = list(items)
+        for a, b in zip(items, items[1:]):
+            after[a].append(b)
+            waiting[b] += 1
+
+    adjacencies = [G.succ, G.pred] if G.is_directed() else [G.adj]
+    for adj in adjacencies:
+        for u in G:
+            if G.is_multigraph():
+                # A pair enters the neighbor list with its first key.
+                chain(position[id(next(iter(keys.values())))] for keys in adj[u].values())
+                for keys in adj[u].values():
+                    chain(position[id(data)] for data in keys.values())
+            else:
+                chain(position[id(data)] for data in adj[u].values())
+
+    ready = [i for i in range(len(edges)) if not waiting[i]]
+    order = []
+    while ready:
+        i = heapq.heappop(ready)
+        order.append(edges[i])
+        for j in after[i]:
+            waiting[j] -= 1
+            if not waiting[j]:
+                heapq.heappush(ready, j)
+    return order
+
+
+def encode_column(values):
+    # An array for all-str, all-int or all-float values, else None (kept as JSON).
+    kinds = {type(value) for value in values}
+    if kinds not in ({str}, {int}, {float}):
+        return None
+    try:
+        return np.array(values, dtype=str if kinds == {str} else None)
+    except OverflowError:
+        return None
+
+
+class TopologyCache:
+    """Compiled GML topologies on disk, one directory per file and version.
+
+    A directory holds the node ID table, the edges as an E x 2 array of
+    node IDs in insertion order, and the node and edge attribute columns
+    as .npy files, plus meta.json for the graph attributes and any column
+    that is not a plain str, int or float array. The arrays are loaded
+    memory-mapped, so the processes of a sweep share the pages read.
+
+    Entries are named after the GML path and the SHA-256 of its contents:
+    an edited file is compiled again and the old entry removed, so a stale
+    graph is never served.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+
+    def prefix(self, path):
+        return hashlib.sha256(os.path.abspath(path).encode()).hexdigest()[:16] + '-'
+
+    def path(self, path, source_hash):
+        return os.path.join(self.cache_dir, self.prefix(path) + source_hash[:32])
+
+    def get(self, path, source_hash):
+        entry = self.path(path, source_hash)
+        try:
+            with open(os.path.join(entry, 'meta.json'), encoding='utf-8') as f:
+                meta = json.load(f)
+
+            def column(ref):
+                if 'file' in ref:
+                    return np.load(os.path.join(entry, ref['file']), mmap_mode='r').tolist()
+                return ref['values']
+
+            nodes = column(meta['nodes'])
+            edges = np.load(os.path.join(entry, 'edges.npy'), mmap_mode='r')
+            node_attributes = {name: column(ref) for name, ref in meta['node_attributes'].items()}
+            edge_attributes = {name: column(ref) for name, ref in meta['edge_attributes'].items()}
+            keys = column(meta['keys']) if meta['multigraph'] else None
+        except (OSError, ValueError, KeyError):
+            return None
+
+        G = GRAPH_TYPES[meta['directed'], meta['multigraph']]()
+        G.graph.update(meta['graph'])
+        G.add_nodes_from(
+            (v, {name: values[i] for name, values in node_attributes.items() if values[i] is not None})
+            for i, v in enumerate(nodes)
+        )
+        ends = edges.tolist()
+        for i, (u, v) in enumerate(ends):
+            data = {name: values[i] for name, values in edge_attributes.items() if values[i] is not None}
+            if keys is None:
+                G.add_edge(nodes[u], nodes[v], **data)
+            else:
+                G.add_edge(nodes[u], nodes[v], keys[i], **data)
+        return G
+
+    def put(self, path, source_hash, G):
+        nodes = list(G.nodes())
+        node_ids = {v: i for i, v in enumerate(nodes)}
+        edges = insertion_order(G)
+        meta = {
+            'source': source_hash,
+            'directed': G.is_directed(),
+            'multigraph': G.is_multigraph(),
+            'graph': G.graph,
+            'node_attributes': {},
+            'edge_attributes': {},
+        }
+        node_names = list(dict.fromkeys(name for _, data in G.nodes(data=True) for name in data))
+        edge_names = list(dict.fromkeys(name for *_, data in edges for name in data))
+        columns = {'nodes': nodes}
+        if G.is_multigraph():
+            columns['keys'] = [key for _, _, key, _ in edges]
+        columns.update({('node', name): [G.nodes[v].get(name) for v in nodes] for name in node_names})
+        columns.update({('edge', name): [data.get(name) for *_, data in edges] for name in edge_names})
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        # Build in a temporary directory and rename, so parallel runs never see a partial entry.
+        tmp = tempfile.mkdtemp(dir=self.cache_dir, suffix='.tmp')
+        ends = np.array([(node_ids[u], node_ids[v]) for u, v, _, _ in edges], dtype=np.int32).reshape(-1, 2)
+        np.save(os.path.join(tmp, 'edges.npy'), ends)
+        for i, (column, values) in enumerate(columns.items()):
+            array = encode_column(values)
+            if array is None:
+                ref = {'values': values}
+            else:
+                ref = {'file': f'{i}.npy'}
+                np.save(os.path.join(tmp, ref['file']), array)
+            if isinstance(column, tuple):
+                meta[f'{column[0]}_attributes'][column[1]] = ref
+            else:
+                meta[column] = ref
+        with open(os.path.join(tmp, 'meta.json'), 'w', encoding='utf-8') as f:
+            json.dump(meta, f)
+
+        entry = self.path(path, source_hash)
+        try:
+            os.rename(tmp, entry)
+        except OSError:
+            # Another process compiled the same version first.
+            shutil.rmtree(tmp, ignore_errors=True)
+        prefix = self.prefix(path)
+        for name in os.listdir(self.cache_dir):
+            if name.startswith(prefix) and os.path.join(self.cache_dir, name) != entry:
+                shutil.rmtree(os.path.join(self.cache_dir, name), ignore_errors=True)
+
+
+def simple_graph(G):
+    """G as an nx.Graph, its parallel links merged into one.
+
+    A merged link keeps the attributes of the first of its links, except
+    the capacities in CAPACITY_ATTRIBUTES, which add up over the links
+    that give them. Anything other than an undirected multigraph is
+    returned as it is.
+    """
+    if not G.is_multigraph() or G.is_directed():
+        return G
+    H = nx.Graph()
+    H.graph.update(G.graph)
+    H.add_nodes_from(G.nodes(data=True))
+    for u, v, data in G.edges(data=True):
+        if not H.has_edge(u, v):
+            H.add_edge(u, v, **data)
+            continue
+        merged = H[u][v]
+        for name in CAPACITY_ATTRIBUTES:
+            if name in data:
+                merged[name] = merged.get(name, 0) + data[name]
+    return H
+
+
+def read_topology(path, cache=None):
+    # nx.read_gml(path, destringizer=None), served from a TopologyCache when
+    # one is given: the file is only parsed when its hash has no entry yet.
+    if cache is None:
+        return nx.read_gml(path, destringizer=None)
+    source_hash = file_hash(path)
+    G = cache.get(path, source_hash)
+    if G is None:
+        G = nx.read_gml(path, destringizer=None)
+        cache.put(path, source_hash, G)
+    return G